@@ -8,8 +8,9 @@ import yaml
 from importlib.metadata import distribution
 from pathlib import Path
 
-from zoti_yaml import Module
-from zoti_gen.builder import Builder
+from zoti_yaml import Module, binary
+from zoti_gen.builder import Builder, build_many
+from zoti_gen.jinja_extensions import use_bytecode_cache
 import zoti_gen.io as io
 import zoti_gen._main_utils as _mu
 
@@ -17,8 +18,8 @@ dist = distribution("zoti_gen")
 parser = argparse.ArgumentParser(
     prog="zoti-gen",
     description="ZOTI template-based code generator.\n\n"
-    "If input is received to the stdin it assumes it is the main module in jSON "
-    "format and\nignores --main. Files passed to --input are loaded as auxiliary "
+    "If input is received to the stdin it assumes it is the main module in JSON "
+    "(or binary)\nformat and ignores --main. Files passed to --input are loaded as auxiliary "
     "modules.",
     formatter_class=argparse.RawTextHelpFormatter,
 )
@@ -31,7 +32,7 @@ parser.add_argument(
 )
 parser.add_argument(
     "-i", "--input", metavar="FILE", type=str, nargs='+',
-    help="Input file(s). Accepts only '.yml', '.yaml' and '.json' files.\n"
+    help="Input file(s). Accepts only '.yml', '.yaml', '.json' and '.zob' files.\n"
     "Other file types are ignored.",
 )
 parser.add_argument(
@@ -46,10 +47,33 @@ parser.add_argument(
     type=argparse.FileType('w'),
     default=sys.stdout,
 )
+parser.add_argument(
+    "--batch", metavar="MODULE", type=str, nargs="*",
+    help="Generates code for many main modules in one process, each in a\n"
+    "'<MODULE>.c' file under --out-dir. If no MODULE is given, all loaded\n"
+    "modules with a 'top' entry are generated. Ignores --main and --out.",
+)
+parser.add_argument(
+    "--out-dir", metavar="PATH", type=str,
+    help="""Output folder for --batch. Default is '.' """,
+)
+parser.add_argument(
+    "-j", "--jobs", metavar="N", type=int,
+    help="Number of worker processes for --batch. Default is the number of CPUs.",
+)
 parser.add_argument(
     "-l", "--lib", type=str, nargs='+',
     help="""Path to loaded component libraries. Complements PYTHONPATH.""",
 )
+parser.add_argument(
+    "--cache-dir", metavar="PATH", type=str,
+    help="Stores compiled templates in PATH and reuses them in later runs.",
+)
+parser.add_argument(
+    "--precompile", action="store_true",
+    help="Compiles all templates from the libraries passed to --lib into the\n"
+    "cache at --cache-dir and exits.",
+)
 parser.add_argument(
     "-d", '--deps', metavar="FILE", nargs="?", default="none",
     help="Dump the resolved dependencies as a JSON file. If provided without\n"
@@ -88,6 +112,9 @@ default_args = {
     "dump_path": ".",
     "begin_block": None,
     "end_block": None,
+    "cache_dir": None,
+    "out_dir": ".",
+    "jobs": None,
 }
 
 # load configuration
@@ -102,6 +129,17 @@ try:
     conf = _mu.load_config("zoti.gen", args, default_args)
     log.info(f"{conf}")
 
+    if conf["lib"]:
+        sys.path += conf["lib"]
+    if conf["cache_dir"]:
+        use_bytecode_cache(conf["cache_dir"])
+    if args.precompile:
+        if not (conf["lib"] and conf["cache_dir"]):
+            raise ValueError("--precompile requires both --lib and --cache-dir")
+        count = io.precompile(conf["lib"])
+        log.info(f"  * Precompiled {count} templates in '{conf['cache_dir']}'")
+        exit(0)
+
     modules = []
     try:
         modules.append(Module(*_mu.read_json_from_stdin()))
@@ -115,23 +153,37 @@ try:
         elif path.suffix in [".json"]:
             with open(path) as f:
                 modules.append(Module(*json.load(f)))
+        elif path.suffix in [".zob"]:
+            with open(path, "rb") as f:
+                modules.append(Module(*binary.load(f)))
         else:
             log.info(f"Ignoring file '{path}'")
-    main = conf["main"] if conf["main"] else modules[0].preamble["module"]
 
-    if conf["lib"]:
-        sys.path += conf["lib"]
+    if args.batch is not None:
+        mains = (args.batch if args.batch else
+                 [m.name for m in modules if "top" in m.preamble])
+        out_dir = Path(conf["out_dir"])
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for main, code, requs in build_many(
+                mains, modules, jobs=conf["jobs"],
+                annotation=(conf["begin_block"], conf["end_block"])):
+            with open(out_dir.joinpath(f"{main}.c"), "w") as f:
+                f.write(code)
+                log.info(f"  * Dumped code file '{f.name}'")
+            if conf["deps"] != "none":
+                with open(out_dir.joinpath(f"{main}.deps.json"), "w") as f:
+                    json.dump(requs, f)
+                    log.info(f"  * Dumped dependency spec '{f.name}'")
+        exit(0)
+
+    main = conf["main"] if conf["main"] else modules[0].preamble["module"]
 
     gen = Builder(main, modules,
                   annotation=(conf["begin_block"], conf["end_block"]))
     gen.parse()
     gen.resolve()
 
-    for cp in gen.decls:
-        block = gen.get(cp).code
-        if block:
-            args.out.write(block)
-            args.out.write("\n\n")
+    args.out.write(gen.code())
     log.info(f"  * Dumped code file '{args.out.name}'")
 
     if conf["deps"] != "none":
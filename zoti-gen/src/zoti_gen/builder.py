@@ -1,8 +1,10 @@
 import importlib
+import sys
 import types
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
-from typing import Dict, List, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import logging as log
 
 import marshmallow as mm
@@ -13,6 +15,43 @@ import zoti_gen.util as util
 from zoti_gen.core import Block, Label, Requirement, Template
 from zoti_gen.exceptions import ModelError, ParseError, ValidationError
 
+__zoti_gen_libs__: Dict[str, types.ModuleType] = {}
+
+
+def load_library(module: str) -> types.ModuleType:
+    """Returns the (executed) template library *module*. Each library
+    module is executed only once per process and cached for all later
+    calls, regardless of the :class:`Builder` requesting it.
+
+    """
+    if module in __zoti_gen_libs__:
+        return __zoti_gen_libs__[module]
+    spec = importlib.util.find_spec(module)
+    if spec is None:
+        raise ImportError(f"Cannot find module '{module}'")
+    # m = spec.loader.load_module(module)  # DEPRECATED!
+    m = types.ModuleType(spec.loader.name)
+    spec.loader.exec_module(m)
+    if m is None:
+        raise ImportError(f"Cannot load module '{module}'")
+    __zoti_gen_libs__[module] = m
+    log.info(f"  - Loaded template library '{module}'")
+    return m
+
+
+def invalidate_libraries(*modules: str) -> None:
+    """Drops the given template library *modules* from the cache (see
+    :func:`load_library`), or all of them if none is given, forcing
+    them to be re-executed at the next request. Useful in interactive
+    sessions, after editing a library.
+
+    """
+    if not modules:
+        __zoti_gen_libs__.clear()
+    for module in modules:
+        __zoti_gen_libs__.pop(module, None)
+    util.read_at_cache_clear()
+
 
 class Builder:
     """This handler takes care of loading input specifications, templates,
@@ -43,9 +82,10 @@ class Builder:
     """Resolved dependencies. Available only after calling
     :meth:`resolve()`."""
 
-    decls: List
-    """ List of component declared at top level. Available only after
-    calling :meth:`resolve()`."""
+    decls: Dict[ty.Ref, None]
+    """Insertion-ordered set (i.e., dictionary with empty values) of
+    components declared at top level. Available only after calling
+    :meth:`resolve()`."""
 
     def __init__(self, main: str, srcs: List[Module], annotation=(None, None)):
         # self.main = main
@@ -67,7 +107,7 @@ class Builder:
         assert "top" in modules[main].preamble
         self.main = ty.Ref(module=main, name=modules[main].preamble["top"])
         self.requs = Requirement({})
-        self.decls = []
+        self.decls = {}
 
     def get(self, ref=None, caller=None) -> Block:
         """Gets a :class:`Block` object using its qualified name. If the the
@@ -77,7 +117,9 @@ class Builder:
 
              | it searches the specifications
              | if it refers to a library template
-             |   | it imports the base constructor using `importlib <https://docs.python.org/3/library/importlib.html>`_
+             |   | it imports the base constructor using `importlib
+                   <https://docs.python.org/3/library/importlib.html>`_
+                   (once, see :func:`load_library`)
              | else
              |   | uses :class:`Block` base constructor
              | parses the specifications and constructs the block
@@ -85,14 +127,7 @@ class Builder:
         """
 
         def _get_spec(module, name):
-            spec = importlib.util.find_spec(module)
-            if spec is None:
-                raise ImportError(f"Cannot find module '{module}'")
-            # m = spec.loader.load_module(module)  # DEPRECATED!
-            m = types.ModuleType(spec.loader.name)
-            spec.loader.exec_module(m)
-            if m is None:
-                raise ImportError(f"Cannot load module '{module}'")
+            m = load_library(module)
             if name not in vars(m):
                 raise ImportError(
                     f"Spec for '{name}' not found in module '{module}'")
@@ -135,6 +170,19 @@ class Builder:
 
         return comp
 
+    def code(self) -> str:
+        """Returns the target code of all top-level declarations, in the
+        order in which they were declared. Available only after
+        calling :meth:`resolve()`.
+
+        """
+        code = ""
+        for cp in self.decls:
+            block = self.get(cp).code
+            if block:
+                code += block + "\n\n"
+        return code
+
     def parse(self):
         """Recursively parses a loaded project (i.e., containing input
         specifications) and creates the (hidden) internal
@@ -250,7 +298,7 @@ class Builder:
                 log.info(f"  - Making new block for instance ...")
                 labels = b_labels if ty.PRAGMA_PASS in inst.directive else {}
                 _recursive_blks(comp, labels, b_params, set(self.decls))
-                self.decls.append(inst.block)
+                self.decls[inst.block] = None
                 _check_attr(comp, ty.ATTR_CODE, ty.ATTR_PROTO)
                 comp.code = comp.prototype.render(
                     # CONTEXT-BEGIN: prototype
@@ -360,4 +408,68 @@ class Builder:
             )
         except Exception as e:
             raise ModelError(e, "main", obj=main)
-        self.decls.append(self.main)
+        self.decls[self.main] = None
+
+
+_batch_srcs: List[Module] = []
+_batch_annotation: Tuple = (None, None)
+
+
+def _batch_init(srcs, annotation, path):
+    global _batch_srcs, _batch_annotation
+    _batch_srcs, _batch_annotation = srcs, annotation
+    for p in path:
+        if p not in sys.path:
+            sys.path.append(p)
+
+
+def _batch_build(main) -> Tuple[str, Dict]:
+    try:
+        gen = Builder(main, _batch_srcs, annotation=_batch_annotation)
+        gen.parse()
+        gen.resolve()
+        return gen.code(), gen.requs.as_dict()
+    except Exception as e:
+        # ZOTI exceptions do not survive pickling between processes
+        raise Exception(f"Failed generating code for '{main}':\n{e}")
+
+
+def build_many(
+        mains: List[str],
+        srcs: List[Module],
+        annotation=(None, None),
+        jobs: Optional[int] = None
+) -> Iterator[Tuple[str, str, Dict]]:
+    """Parses and resolves each module in *mains* (see :class:`Builder`)
+    and yields a tuple (*main*, *code*, *requirements*) for each of
+    them, in the same order as *mains*. All builders share the same
+    *srcs* and *annotation*.
+
+    The builds are distributed over a pool of *jobs* processes
+    (default is the number of CPUs). The template libraries used by
+    *srcs* are loaded in the current process beforehand, so that
+    workers can inherit them instead of loading them anew. If *jobs*
+    is 1, everything is built in the current process.
+
+    """
+    for mod in srcs:
+        for blk in mod.doc.get(ty.ATTR_BLOCK, []):
+            if ty.ATTR_TYPE in blk:
+                try:
+                    load_library(blk[ty.ATTR_TYPE]["module"])
+                except Exception:
+                    pass  # reported by the builder which needs it
+
+    if jobs == 1 or len(mains) < 2:
+        _batch_init(srcs, annotation, [])
+        for main in mains:
+            code, requs = _batch_build(main)
+            yield main, code, requs
+        return
+
+    with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_batch_init,
+            initargs=(srcs, annotation, list(sys.path))
+    ) as pool:
+        for main, (code, requs) in zip(mains, pool.map(_batch_build, mains)):
+            yield main, code, requs
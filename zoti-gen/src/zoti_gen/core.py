@@ -7,7 +7,7 @@ from typing import Dict, List, Optional
 import marshmallow as mm
 import networkx as nx
 import zoti_yaml as zoml
-from zoti_gen.jinja_extensions import __zoti_gen_env__
+from zoti_gen.jinja_extensions import __zoti_gen_cache__
 from zoti_gen.exceptions import TemplateError
 
 ATTR_NAME = "name"
@@ -73,7 +73,7 @@ class Template:
         }
         context.update(kwargs)
         try:
-            tm = __zoti_gen_env__.from_string(self.string)
+            tm = __zoti_gen_cache__.get(self.string)
             return tm.render(**context)
         except Exception:
             ty, msg, exc_tb = sys.exc_info()
@@ -144,7 +144,8 @@ class Requirement:
                 if key in self.requirement:
                     self.requirement[key].update(graph)
                 else:
-                    self.requirement[key] = graph
+                    # copy, since 'other' may be a library default
+                    self.requirement[key] = graph.copy()
 
     def dep_list(self, key) -> List:
         """Returns a list with the solved dependencies for a certain
@@ -191,9 +192,12 @@ class RequirementField(mm.fields.Field):
 # INSTANCE #
 ############
 
-@dataclass(repr=False)
+@dataclass(frozen=True, repr=False)
 class Ref:
-    """Hashable reference to a user block or a library component."""
+    """Hashable reference to a user block or a library component. It is
+    an immutable value whose hash is computed once, at creation."""
+
+    __slots__ = ("module", "name", "_hash")
 
     module: str
     """qualified name of module"""
@@ -201,11 +205,17 @@ class Ref:
     name: str
     """name of block"""
 
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash((self.module, self.name)))
+
     def __repr__(self):
         return f"{self.module}.{self.name}"
 
     def __hash__(self):
-        return hash("{self.module}{self.name}")
+        return self._hash
+
+    def __reduce__(self):
+        return (Ref, (self.module, self.name))
 
 
 class RefSchema(mm.Schema):
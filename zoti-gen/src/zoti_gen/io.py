@@ -1,11 +1,16 @@
+import dataclasses
+import pkgutil
 import pydot
 import yaml
 import logging as log
 from importlib.metadata import distribution
+from typing import List
 
 import zoti_yaml as zoml
 import zoti_gen.util as util
-from zoti_gen.core import Block, Label, Requirement
+from zoti_gen.builder import load_library
+from zoti_gen.core import Block, Label, Requirement, Template
+from zoti_gen.jinja_extensions import __zoti_gen_cache__
 
 dist = distribution("zoti_gen")
 
@@ -23,6 +28,41 @@ def print_zoti_yaml_keys():
     return ["block", "label", "instance", "bind"]
 
 
+def precompile(libs: List[str]) -> int:
+    """Loads all modules of the template libraries rooted in *libs* (with
+    :func:`zoti_gen.builder.load_library`, same as when building) and
+    compiles the default templates of every component found, including
+    those created by a ``default_factory``. Meant to be called after
+    enabling an on-disk cache with
+    :func:`zoti_gen.jinja_extensions.use_bytecode_cache`, so that
+    later runs load the compiled templates instead. The roots need to
+    be importable (e.g., in ``sys.path``). Returns the number of
+    distinct templates compiled.
+
+    """
+    def _default(fld):
+        if fld.default_factory is not dataclasses.MISSING:
+            return fld.default_factory()
+        return fld.default
+
+    strings = set()
+    for _, name, _ in pkgutil.walk_packages(libs):
+        # same loader as the builder, so libraries run only once
+        module = load_library(name)
+        for obj in vars(module).values():
+            cls = getattr(obj, "__wrapped__", obj)
+            if not (isinstance(cls, type) and dataclasses.is_dataclass(cls)):
+                continue
+            for fld in dataclasses.fields(cls):
+                default = _default(fld)
+                if isinstance(default, Template) and default:
+                    strings.add(default.string)
+        log.info(f"  - Precompiled templates in '{name}'")
+    for string in strings:
+        __zoti_gen_cache__.get(string)
+    return len(strings)
+
+
 def dump_yaml(B, path):
     """Dumps all parsed blocks up to this point as a YAML file."""
     with open(path, "w") as f:
@@ -1,8 +1,10 @@
 import operator
+from collections import OrderedDict
 from functools import reduce
+from pathlib import Path
 from typing import Any, Dict
 
-from jinja2 import Environment, pass_context
+from jinja2 import Environment, FileSystemBytecodeCache, Template, pass_context
 
 
 class JinjaExtensions:
@@ -73,7 +75,7 @@ class JinjaExtensions:
     def eval(context: Dict, string: str) -> str:
         """Renders a Jinja2 string within a *context*. Useful if both *string*
         and *context* are passed to the current template context."""
-        return Template(string).render(context)
+        return __zoti_gen_cache__.get(string).render(context.get_all())
 
     @staticmethod
     def error(msg: str, *args) -> None:
@@ -153,4 +155,93 @@ class ZotiEnvironment(Environment):
             self.globals[f] = vars(JinjaExtensions)[f].__func__
 
 
+class TemplateCache:
+    """Bounded LRU cache of compiled Jinja templates, keyed by their
+    source string. It ensures that each distinct template string is
+    parsed and compiled only once, regardless of how many
+    :class:`zoti_gen.core.Template` objects carry it.
+
+    :param env: the Jinja environment used for compiling templates.
+
+    :param maxsize: maximum number of compiled templates kept in
+      memory. Least recently used entries are evicted first.
+
+    If the environment has a ``bytecode_cache`` set (see
+    :func:`use_bytecode_cache`), templates not found in memory are
+    looked up on disk by the hash of their source before being
+    compiled.
+
+    """
+
+    hits: int
+    """number of lookups served from the cache"""
+
+    misses: int
+    """number of lookups which needed a fresh compilation"""
+
+    def __init__(self, env: Environment, maxsize: int = 1024):
+        self._env = env
+        self._store: OrderedDict[str, Template] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, string):
+        return string in self._store
+
+    def get(self, string: str) -> Template:
+        """Returns the compiled template for *string*, compiling and
+        storing it if not found."""
+        tm = self._store.get(string)
+        if tm is not None:
+            self._store.move_to_end(string)
+            self.hits += 1
+            return tm
+        self.misses += 1
+        tm = self._compile(string)
+        self._store[string] = tm
+        if len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+        return tm
+
+    def _compile(self, string: str) -> Template:
+        bcc = self._env.bytecode_cache
+        if bcc is None:
+            return self._env.from_string(string)
+        # the source itself is the bucket name, i.e. the key is its hash
+        bucket = bcc.get_bucket(self._env, string, None, string)
+        if bucket.code is None:
+            bucket.code = self._env.compile(string)
+            bcc.set_bucket(bucket)
+        return self._env.template_class.from_code(
+            self._env, bucket.code, self._env.make_globals(None))
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 __zoti_gen_env__ = ZotiEnvironment()
+__zoti_gen_cache__ = TemplateCache(__zoti_gen_env__)
+
+
+def use_bytecode_cache(directory) -> None:
+    """Stores the bytecode of all compiled templates in *directory* (see
+    `Jinja bytecode cache
+    <https://jinja.palletsprojects.com/en/3.1.x/api/#bytecode-cache>`_),
+    so that later runs can load them without recompiling. Passing
+    ``None`` disables the on-disk cache.
+
+    """
+    __zoti_gen_cache__.clear()
+    if directory is None:
+        __zoti_gen_env__.bytecode_cache = None
+        return
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    __zoti_gen_env__.bytecode_cache = FileSystemBytecodeCache(path.as_posix())
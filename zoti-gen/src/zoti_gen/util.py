@@ -1,5 +1,6 @@
 import pkgutil
 import re
+from functools import lru_cache
 from typing import Set, Tuple
 
 from marshmallow import post_load
@@ -34,6 +35,7 @@ def with_schema(schema_base_class):
                 def make(self, data, **kwargs):
                     return cls(**data)
 
+        Wrapper.__wrapped__ = cls
         return Wrapper
 
     return Inner
@@ -49,6 +51,20 @@ C_DELIMITERS = ("// *Template: *{name}", "// *End: *{name}")
 VHDL_DELIMITERS = ("-- *Template: *{name}", "-- *End: *{name}")
 
 
+@lru_cache(maxsize=None)
+def _read_source(module: str, filename: str) -> str:
+    textfile = pkgutil.get_data(module, filename)
+    if textfile is None:
+        msg = f"Cannot load file '{filename}' relative to '{module}'"
+        raise IOError(msg)
+    return textfile.decode()
+
+
+@lru_cache(maxsize=None)
+def _delimited(begin: str, end: str) -> re.Pattern:
+    return re.compile(r"%s(.*?)%s" % (begin, end), re.S)
+
+
 def read_at(module: str, filename: str, name: str,
             delimiters: Tuple[str, str] = C_DELIMITERS) -> str:
     """Returns a template string from a (possibly formatted) external
@@ -69,16 +85,15 @@ def read_at(module: str, filename: str, name: str,
         issued template, formatted as regular expressions where
         ``{name}`` is replaced with **name**.
 
+    Source files and delimiter patterns are cached, so a file shared
+    by many components is read only once per process.
+
     """
     begin = delimiters[0].format(name=name)
     end = delimiters[1].format(name=name)
-    m = re.compile(r"%s(.*?)%s" % (begin, end), re.S)
+    m = _delimited(begin, end)
 
-    textfile = pkgutil.get_data(module, filename)
-    if textfile is None:
-        msg = "Cannot load file '{filename}' relative to '{module}'"
-        raise IOError(msg)
-    text = m.search(textfile.decode())
+    text = m.search(_read_source(module, filename))
     if text:
         t = text.group(1)
     else:
@@ -87,6 +102,12 @@ def read_at(module: str, filename: str, name: str,
     return t
 
 
+def read_at_cache_clear() -> None:
+    """Forgets all source files and patterns cached by :func:`read_at`."""
+    _read_source.cache_clear()
+    _delimited.cache_clear()
+
+
 def qualname(o):
     klass = o.__class__
     module = klass.__module__
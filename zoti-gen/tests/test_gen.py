@@ -24,7 +24,7 @@ def test_scenario1() -> None:
 
     assert len(gen.decls) == 1
     assert gen.get(
-        gen.decls[0]).code == "void mulacc(in1, in2, acc, &out) {\n \nout = acc + in1 * in2;\n \n};"
+        next(iter(gen.decls))).code == "void mulacc(in1, in2, acc, &out) {\n \nout = acc + in1 * in2;\n \n};"
 
     gen2 = Builder("main", mods)
     gen2.parse()
@@ -41,3 +41,96 @@ def test_scenario1() -> None:
     finally:
         os.remove("tmp.dot", )
         os.remove("tmp.yaml")
+
+
+def test_template_cache() -> None:
+    from zoti_gen.core import Template
+    from zoti_gen.jinja_extensions import __zoti_gen_cache__ as cache
+
+    cache.clear()
+    string = "{{ param.a }}-{{ eval('{{ param.a }}') }}"
+    for _ in range(3):
+        assert Template(string).render(param={"a": 1}) == "1-1"
+    assert len(cache) == 2
+    assert cache.misses == 2
+    assert cache.hits == 4
+
+
+def test_precompile(tmp_path) -> None:
+    from zoti_gen.jinja_extensions import __zoti_gen_cache__ as cache
+    from zoti_gen.jinja_extensions import use_bytecode_cache
+
+    try:
+        use_bytecode_cache(tmp_path)
+        assert io.precompile(["tests/inputs"]) > 0
+        stored = len(list(tmp_path.iterdir()))
+        assert stored == cache.misses
+
+        # a fresh in-memory cache loads the bytecode from disk
+        use_bytecode_cache(tmp_path)
+        io.precompile(["tests/inputs"])
+        assert len(list(tmp_path.iterdir())) == stored
+    finally:
+        use_bytecode_cache(None)
+
+
+def test_precompile_factory(tmp_path) -> None:
+    from zoti_gen.builder import __zoti_gen_libs__
+
+    tmp_path.joinpath("factory_lib.py").write_text(
+        "from dataclasses import dataclass, field\n"
+        "from zoti_gen import Block, Template\n\n"
+        "@dataclass\n"
+        "class Factory(Block):\n"
+        "    code: Template = field(\n"
+        "        default_factory=lambda: Template('{{ name }} from factory'))\n")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        assert io.precompile([str(tmp_path)]) == 1
+        assert "factory_lib" in __zoti_gen_libs__
+    finally:
+        sys.path.remove(str(tmp_path))
+        __zoti_gen_libs__.pop("factory_lib", None)
+
+
+def test_library_cache() -> None:
+    from zoti_gen.builder import load_library, invalidate_libraries
+
+    invalidate_libraries()
+    mod = load_library("Generic.IO")
+    assert load_library("Generic.IO") is mod
+    invalidate_libraries("Generic.IO")
+    assert load_library("Generic.IO") is not mod
+
+
+def test_ref() -> None:
+    import pickle
+    from copy import deepcopy
+    from zoti_gen.core import Ref
+
+    refs = {Ref("a.b", "c"), Ref("a.b", "c"), Ref("a", "b.c"), Ref("a.b", "d")}
+    assert len(refs) == 3
+    ref = Ref("a.b", "c")
+    assert pickle.loads(pickle.dumps(ref)) == ref
+    assert hash(deepcopy(ref)) == hash(ref)
+
+
+def test_build_many() -> None:
+    from zoti_gen.builder import build_many
+
+    mods = []
+    with open("tests/inputs/genspec_main.yaml") as f:
+        mods.append(Module(*yaml.load_all(f, Loader=yaml.Loader)))
+    with open("tests/inputs/genspec_leafs.yaml") as f:
+        mods.append(Module(*yaml.load_all(f, Loader=yaml.Loader)))
+
+    mains = ["main", "genspec_leafs"]
+    serial = list(build_many(mains, mods, jobs=1))
+    parallel = list(build_many(mains, mods, jobs=2))
+    assert [m for m, _, _ in parallel] == mains
+    assert serial == parallel
+    for main, code, _ in serial:
+        gen = Builder(main, mods)
+        gen.parse()
+        gen.resolve()
+        assert code == gen.code()
@@ -2,7 +2,7 @@ from .appgraph import AppGraph
 from .core import *
 from .io import *
 from .script import Script
-from .exceptions import ScriptError, ContextError
+from .exceptions import ScriptError, ContextError, SanityError
 from importlib.metadata import distribution
 
 
@@ -10,6 +10,7 @@ from importlib.metadata import distribution
 from pathlib import Path
 
 import zoti_graph.io as io
+from zoti_yaml import binary
 import zoti_graph._main_utils as _mu
 
 
@@ -18,7 +19,7 @@ parser = argparse.ArgumentParser(
     prog="zoti-graph",
     description="ZOTI application graph representation, implemented in Python.\n\n"
     "The following formats are available as inputs/outputs:\n"
-    " - *.yaml|*.json: _only inputs_, parsed and schema-validated;\n"
+    " - *.yaml|*.json|*.zob: _only inputs_, parsed and schema-validated;\n"
     " - *.raw.json: raw format, compatible with any ZOTI graph representer"
     f" version ^{dist.version};\n"
     " - *.raw.p: raw binary data, compatible with only this representer.",
@@ -39,7 +40,7 @@ parser.add_argument(
 )
 parser.add_argument(
     "-i", "--input", metavar="FILE",
-    help="If not specified reads the content of a '.json' file from stdin.",
+    help="If not specified reads the content of a '.json' or '.zob' file from stdin.",
     type=argparse.FileType('r'),
     default=sys.stdin,
 )
@@ -49,6 +50,10 @@ parser.add_argument(
     type=argparse.FileType('w'),
     default=sys.stdout,
 )
+parser.add_argument(
+    "--compact", action="store_true",
+    help="Stores the graph in a compact form, for large graphs.",
+)
 action = parser.add_argument_group('debugging')
 action.add_argument(
     "--dump-info", action="store_true",
@@ -79,6 +84,7 @@ default_args = {
     "format": "genny",
     "out": None,
     "dump_path": ".",
+    "compact": False,
     "dump_args": {}
 }
 
@@ -113,15 +119,22 @@ try:
              if not "stdin" in args.input.name else ".json")
     name = (Path(args.input.name).name.split(".")[0]
             if not "stdin" in args.input.name else None)
-    if i_ext in [".yaml", ".yml"]:
+    if "stdin" in args.input.name:
+        log.info("Parsing graph from stdin")
+        G = parse(*_mu.read_json_from_stdin(), compact=conf["compact"])
+    elif i_ext in [".yaml", ".yml"]:
         log.info(f"Parsing graph from YAML: {args.input.name}")
-        G = parse(*yaml.load_all(args.input, Loader=io.ZotiGraphLoader))
+        G = parse(*yaml.load_all(args.input, Loader=io.ZotiGraphLoader),
+                  compact=conf["compact"])
     elif i_ext in [".json"]:
         log.info(f"Parsing graph from JSON: {args.input.name}")
-        G = parse(*json.load(args.input))
+        G = parse(*json.load(args.input), compact=conf["compact"])
+    elif i_ext in [".zob"]:
+        log.info(f"Parsing graph from binary: {args.input.name}")
+        G = parse(*binary.load(args.input.buffer), compact=conf["compact"])
     elif i_ext in [".raw.json"]:
         log.info(f"Loading graph from raw YAML: {args.input.name}")
-        G = io.from_raw(args.input, dist.version)
+        G = io.from_raw(args.input, dist.version, compact=conf["compact"])
     elif i_ext in [".raw.p", ".raw.pickle"]:
         log.info(f"Loading graph from raw pickle: {args.input.name}")
         G = pickle.load(args.input)
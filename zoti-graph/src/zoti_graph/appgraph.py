@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from copy import deepcopy
 from typing import Any, List, Tuple, Optional, Dict
 
@@ -7,6 +8,7 @@ import zoti_graph.core as ty
 import zoti_graph.util as util
 from zoti_graph.core import Uid
 from zoti_graph.exceptions import EntryError
+from zoti_graph.storage import IndexedDiGraph, CompactDiGraph
 
 
 class AppGraph:
@@ -15,24 +17,41 @@ class AppGraph:
     `NetworkX <https://networkx.org/documentation/stable/index.html>`_
     algorithms directly on its ``ir`` member.
 
+    If *compact* is set, ``ir`` is stored as a
+    :class:`zoti_graph.storage.CompactDiGraph`, which takes up less
+    memory for large graphs at the cost of slower NetworkX accesses.
+
     """
 
     root: Uid
     """The ID of the root node"""
 
-    ir: nx.DiGraph
+    ir: IndexedDiGraph
     """Internal representation of a ZOTI model as simple annotated digraph. """
 
     _instance: str
 
-    def __init__(self, format_name, root=Uid()):
-        self.ir = nx.DiGraph()
+    _facts: Optional[Dict[str, Dict]] = None
+
+    def __init__(self, format_name, root=Uid(), compact=False):
+        self.ir = CompactDiGraph() if compact else IndexedDiGraph()
         self.root = root if isinstance(root, Uid) else Uid(root)
         self._instance = format_name
 
-    def reset(self, root):
-        """Resets the current application graph and sets the *root* node ID."""
-        self.ir = nx.DiGraph()
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not isinstance(self.ir, IndexedDiGraph):  # pickled by older versions
+            self.ir = IndexedDiGraph(self.ir)
+
+    def reset(self, root, compact=None):
+        """Resets the current application graph and sets the *root* node
+        ID. *compact* selects the storage of the new graph (see
+        :class:`AppGraph`), by default the same as the current one.
+
+        """
+        if compact is None:
+            compact = isinstance(self.ir, CompactDiGraph)
+        self.ir = CompactDiGraph() if compact else IndexedDiGraph()
         self.root = root
 
     def entry(self, uid: Uid) -> Any:
@@ -149,13 +168,11 @@ class AppGraph:
         :class:`zoti_graph.core.Port` entries.
 
         """
+        if parent_id not in self.ir:
+            raise KeyError(f"node {parent_id}")
         try:
-            return [
-                v
-                for u, v in self.ir.out_edges(parent_id)
-                if self.ir[u][v][ty.ATTR_REL] == ty.Rel.PORT
-                if select(self.ir.nodes[v][ty.ATTR_ENT])
-            ]
+            return [v for v in self.ir.tree_ports(parent_id)
+                    if select(self.ir.nodes[v][ty.ATTR_ENT])]
         except Exception:
             raise KeyError(f"node {parent_id}")
 
@@ -165,13 +182,11 @@ class AppGraph:
         entries derived from :class:`zoti_graph.core.NodeABC`.
 
         """
+        if parent_id not in self.ir:
+            raise KeyError(f"node {parent_id}")
         try:
-            return [
-                v
-                for u, v in self.ir.out_edges(parent_id)
-                if self.ir[u][v][ty.ATTR_REL] == ty.Rel.CHILD
-                if select(self.ir.nodes[v][ty.ATTR_ENT])
-            ]
+            return [v for v in self.ir.tree_children(parent_id)
+                    if select(self.ir.nodes[v][ty.ATTR_ENT])]
         except Exception:
             raise KeyError(f"node {parent_id}")
 
@@ -180,15 +195,9 @@ class AppGraph:
         it returns None.
 
         """
-        try:
-            parents = [
-                u
-                for u, v in self.ir.in_edges(node_id)
-                if self.ir[u][v][ty.ATTR_REL] & ty.Rel.TREE
-            ]
-            return parents[0] if parents else None
-        except Exception:
+        if node_id not in self.ir:
             raise KeyError(f"node {node_id}")
+        return self.ir.tree_parent(node_id)
 
     def commonAncestor(self, this: Uid, that: Uid) -> Optional[Uid]:
         """Returns the ID of the common ancestor between *this* and *that*. If
@@ -266,14 +275,26 @@ class AppGraph:
     def connected_ports(self, port, graph=None) -> nx.Graph:
         """Returns a path graph representing the journey between two leaf
         nodes' ports passing through a given *port*, see drawing. The
-        search can be minimized by passing a subgraph to the *graph*
-        argument containing the desired path.
+        search can be restricted by passing a subgraph to the *graph*
+        argument containing the desired path, otherwise it is answered
+        from the connected components maintained by ``ir``.
 
         .. image:: assets/api-1.png
 
         """
-        graph = self.only_graph()
-        return graph.subgraph(nx.shortest_path(graph.to_undirected(), port))
+        if graph is not None:
+            return graph.subgraph(
+                nx.node_connected_component(graph.to_undirected(as_view=True), port))
+        if port not in self.ir:
+            raise nx.NodeNotFound(f"Source {port} is not in G")
+
+        def _edges(n1, n2):
+            return self.ir[n1][n2][ty.ATTR_REL] == ty.Rel.GRAPH
+
+        return nx.subgraph_view(
+            self.ir,
+            filter_node=nx.filters.show_nodes(self.ir.graph_component(port)),
+            filter_edge=_edges)
 
     def end_ports(self, port, graph=None) -> List[ty.Uid]:
         """Variant of :meth:`connected_ports` which returns a list with end
@@ -295,22 +316,18 @@ class AppGraph:
 
     def has_ancestor(self, uid: Uid, ancestor: Uid) -> bool:
         """Checks if *ancestor* is indeed an ancestor of *uid*."""
-        parent = self.parent(uid)
-        if not parent:
-            return False
-        elif parent == ancestor:
-            return True
-        else:
-            return self.has_ancestor(parent, ancestor)
+        if uid not in self.ir:
+            raise KeyError(f"node {uid}")
+        return self.ir.tree_has_ancestor(uid, ancestor)
 
     def depth(self, uid) -> int:
         """Checks at which depth in the hierarchy tree *uid* is found relative
         to the global root."""
         dph = 0
         parent = self.parent(uid)
-        while parent:
+        while parent is not None:
             dph += 1
-            parent = self.parent(parent)
+            parent = self.ir.tree_parent(parent)
         return dph
 
     def bypass_port(self, port, ensure_fanout=False):
@@ -350,7 +367,7 @@ class AppGraph:
         # ATTENTION: children need decoupling
         assert root.parent()
         new_root = root.parent().withNode(new_name)
-        all_children = [c for c in self.ir.nodes if self.has_ancestor(c, root)]
+        all_children = self.ir.tree_descendants(root)
         all_children.append(root)
         G = self.ir.subgraph(all_children)
         mapping = {n: n.replaceRoot(root, new_root) for n in G.nodes()}
@@ -370,7 +387,7 @@ class AppGraph:
 
         """
         assert root.parent()
-        all_children = [c for c in self.ir.nodes if self.has_ancestor(c, root)]
+        all_children = self.ir.tree_descendants(root)
         if with_root:
             all_children.append(root)
         self.ir.remove_nodes_from(all_children)
@@ -552,12 +569,40 @@ class AppGraph:
         try:
             rule(self, *element_id)
         except AssertionError:
-            msg = "Sanity check failed for "
-            if len(element_id) < 2:
-                msg += f"node {element_id[0]}"
-                obj = self.entry(*element_id)
-            else:
-                msg += f"edge {tuple(element_id)}"
-                obj = self.edge(*element_id)
-            msg += f"during rule '{rule.__name__}':"
-            raise EntryError(msg, obj=obj)
+            raise self._sanity_error(rule, *element_id)
+
+    def _sanity_error(self, rule, *element_id) -> EntryError:
+        msg = "Sanity check failed for "
+        if len(element_id) < 2:
+            msg += f"node {element_id[0]}"
+            obj = self.entry(*element_id)
+        else:
+            msg += f"edge {tuple(element_id)}"
+            obj = self.edge(*element_id)
+        msg += f"during rule '{rule.__name__}':"
+        return EntryError(msg, obj=obj)
+
+    @contextmanager
+    def frozen(self):
+        """Context in which the graph is not altered, e.g., while checking
+        sanity rules. Within it, information derived from the graph can
+        be memoized in the tables returned by :meth:`facts`, which are
+        discarded when exiting the (outermost) context.
+
+        """
+        outer = self._facts
+        self._facts = {} if outer is None else outer
+        try:
+            yield self
+        finally:
+            self._facts = outer
+
+    def facts(self, table: str) -> Dict:
+        """Returns the memoization table named *table* for the current
+        :meth:`frozen` context. Outside such a context it returns a new
+        empty table, i.e., nothing is memoized.
+
+        """
+        if self._facts is None:
+            return {}
+        return self._facts.setdefault(table, {})
@@ -63,6 +63,20 @@ class EntryError(Exception):
         return f"{self.pos}\n{self.what}"
 
 
+class SanityError(EntryError):
+    """Exception collecting all the sanity rule violations found in a
+    graph, each as an :class:`EntryError`.
+
+    """
+
+    def __init__(self, violations):
+        self.violations = violations
+        super().__init__(f"{len(violations)} sanity rule violation(s)")
+
+    def __str__(self):
+        return "\n".join([self.what] + [str(v) for v in self.violations])
+
+
 class ScriptError(Exception):
     """Exception handler for pretty errors, possibly containing positional
     information as provided by `ZOTI-YAML <../zoti-yaml/>`_ and rule
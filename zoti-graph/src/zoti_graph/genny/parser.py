@@ -514,7 +514,7 @@ class BasicNodeParser(NodeParser):
         return vars(obj)
 
 
-def parse(*module_args) -> AppGraph:
+def parse(*module_args, compact=False) -> AppGraph:
     """Parses a complete (schema-validated) Genny-Graph input
     specification tree along with its metadata and returns an
     application graph that can be futher process by a ZOTI tool.
@@ -524,6 +524,8 @@ def parse(*module_args) -> AppGraph:
     JSON or YAML file) and should consist at least of a *preamble* and
     a *document*. The ``preamble`` argument is expected to have a
     field ``main-is`` containing the path to the top (i.e. root) node.
+    If *compact* is set, the application graph is stored as a
+    :class:`zoti_graph.storage.CompactDiGraph`.
 
     **ATTENTION:** the design of this library assumes that this
     function is invoked only once per program instance. If for any
@@ -564,7 +566,7 @@ def parse(*module_args) -> AppGraph:
         module.map_doc(_add_uid, with_path=True)
         main_path = PurePosixPath(module.preamble["main-is"])
         top_comp = module.get(main_path)
-        __zoti__.reset(top_comp[META_UID])
+        __zoti__.reset(top_comp[META_UID], compact=compact)
         _ = CompositeNodeParser().load(top_comp)
         return __zoti__
     except mm.ValidationError as error:
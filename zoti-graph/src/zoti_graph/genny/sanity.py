@@ -1,16 +1,30 @@
 from itertools import chain
 
-from zoti_graph.core import Rel, ATTR_REL
 import zoti_graph.genny as ty
 
+# The helpers below memoize their results in the facts of G (see
+# zoti_graph.appgraph.AppGraph.frozen), i.e., they are shared by all
+# the rules checked in a batch (see zoti_graph.script.Script.sanity).
+
 
 def _flatten(n, G):
-    entry = G.entry(n)
-    if isinstance(entry, ty.BasicNode):
-        return []
-    if not isinstance(entry, ty.CompositeNode):
-        return [n]
-    return list(chain.from_iterable([_flatten(c, G) for c in G.children(n)]))
+    memo = G.facts("flatten")
+    if n not in memo:
+        entry = G.entry(n)
+        if isinstance(entry, ty.BasicNode):
+            memo[n] = []
+        elif not isinstance(entry, ty.CompositeNode):
+            memo[n] = [n]
+        else:
+            memo[n] = _non_composite_children(n, G)
+    return memo[n]
+
+
+def _flattened_kinds(n, G):
+    memo = G.facts("flattened_kinds")
+    if n not in memo:
+        memo[n] = frozenset(type(G.entry(c)).__name__ for c in _flatten(n, G))
+    return memo[n]
 
 
 def _non_composite_children(n, G):
@@ -18,11 +32,26 @@ def _non_composite_children(n, G):
 
 
 def _non_composite_parent(n, G):
-    parent = n.parent()
-    assert n != parent
-    if isinstance(G.entry(parent), ty.CompositeNode):
-        return _non_composite_parent(parent, G)
-    return parent
+    memo = G.facts("non_composite_parent")
+    if n not in memo:
+        parent = n.parent()
+        assert n != parent
+        if isinstance(G.entry(parent), ty.CompositeNode):
+            memo[n] = _non_composite_parent(parent, G)
+        else:
+            memo[n] = parent
+    return memo[n]
+
+
+def _port_component(p, G, table, fact):
+    # facts on connected ports hold for the entire connected component
+    memo = G.facts(table)
+    if p not in memo:
+        conn = G.connected_ports(p)
+        value = fact(conn)
+        for q in conn.nodes():
+            memo[q] = value
+    return memo[p]
 
 
 def edge_direction(G, u, v):
@@ -94,12 +123,8 @@ def edge_sibling_kind(G, u, v):
         return
     node_u, node_v = (u.parent(), v.parent())
     if node_u.parent() == node_v.parent():
-        flattened = _flatten(node_u, G) + _flatten(node_v, G)
-        if flattened:
-            first_type = type(G.entry(flattened[0])).__name__
-            for n in flattened[1:]:
-                curr_type = type(G.entry(n)).__name__
-                assert first_type == curr_type
+        kinds = _flattened_kinds(node_u, G) | _flattened_kinds(node_v, G)
+        assert len(kinds) <= 1
 
 
 def node_consistent_tree(G, n):
@@ -110,11 +135,7 @@ def node_consistent_tree(G, n):
     """
     if n == G.root:
         return
-    parents = [
-        u for u, v in G.ir.in_edges(n)
-        if G.ir[u][v][ATTR_REL] & Rel.TREE
-    ]
-    assert len(parents) == 1
+    assert len(G.ir.tree_parents(n)) == 1
 
 
 def node_platform_hierarchy(G, n):
@@ -233,14 +254,20 @@ def port_dangling(G, p):
     ignored).
 
     """
-    if G.entry(p).kind == ty.Dir.SIDE:
-        assert any([
+    def _exposed(conn):
+        return any([
             isinstance(G.entry(G.parent(q)), ty.ActorNode)
-            for q in G.connected_ports(p)
+            for q in conn.nodes()
         ])
-    else:
-        assert all([
+
+    def _terminated(conn):
+        return all([
             isinstance(G.entry(G.parent(q)), ty.KernelNode) or
             isinstance(G.entry(q), ty.BasicNode)
-            for q in G.end_ports(p)
+            for q in conn.nodes() if conn.degree(q) == 1
         ])
+
+    if G.entry(p).kind == ty.Dir.SIDE:
+        assert _port_component(p, G, "side_exposed", _exposed)
+    else:
+        assert _port_component(p, G, "ends_terminated", _terminated)
@@ -166,22 +166,23 @@ def dump_raw(G, stream):
         DIST.version,
         G._instance,
         repr(G.root),
-        list(G.ir.nodes(data=True)),
-        list(G.ir.edges(data=True))
+        [(n, dict(d)) for n, d in G.ir.nodes(data=True)],
+        [(u, v, dict(d)) for u, v, d in G.ir.edges(data=True)]
     ], stream, cls=GenericJSONEncoder)
 
 
-def from_raw(stream, version=None) -> AppGraph:
+def from_raw(stream, version=None, compact=False) -> AppGraph:
     """Deserializes a graph from a *stream* containing the raw JSON
     data as dumped by :meth:`dump_raw`. If *version* is passed, it
     will compare it against the loaded version and raise an error if
-    they do not match.
+    they do not match. If *compact* is set, the graph is stored as a
+    :class:`zoti_graph.storage.CompactDiGraph`.
 
     """
 
     ver, inst, root, nodes, edges = tuple(
         json.load(stream, object_hook=GenericJSONDecoderHook))
-    G = AppGraph(inst, root)
+    G = AppGraph(inst, root, compact=compact)
     if version and version != ver:
         msg = f"Cannot load {stream.name}. Document format version "
         msg += f"{ver} does not match with tool version {version}"
@@ -1,13 +1,14 @@
 import pickle
 import logging as log
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Callable, Dict, List, Optional
 
 from zoti_graph.appgraph import AppGraph
-from zoti_graph.core import Port
+from zoti_graph.core import ATTR_REL, Port, Rel
 from zoti_graph.io import dump_node_info, draw_graphviz, draw_tree
-from zoti_graph.exceptions import ScriptError
+from zoti_graph.exceptions import SanityError, ScriptError
 
 
 @dataclass(eq=False, repr=False)
@@ -54,6 +55,42 @@ class TransSpec:
     """
 
 
+def _check_shard(G: AppGraph, edge_rules, port_rules, node_rules, nodes):
+    # returns the violations found for a set of nodes, their ports and
+    # the edges leaving them, as (rule, element) pairs
+    found = {"edge": [], "node": []}
+
+    def _check(kind, rules, *element):
+        for rule in rules:
+            try:
+                rule(G, *element)
+            except AssertionError:
+                found[kind].append((rule, element))
+
+    with G.frozen():
+        for node in nodes:
+            for dst, attr in G.ir.adj[node].items():
+                if attr.get(ATTR_REL) == Rel.GRAPH:
+                    _check("edge", edge_rules, node, dst)
+            if isinstance(G.entry(node), Port):
+                _check("node", port_rules, node)
+            else:
+                _check("node", node_rules, node)
+    return found
+
+
+_worker_args: tuple = ()  # graph and rules checked by a worker process
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _check_worker_shard(nodes):
+    return _check_shard(*_worker_args, nodes)
+
+
 class Script:
     """Transformation script handler. It storgit ses an application graph and
     (possibly) a data type handler and contains utilities for
@@ -99,7 +136,7 @@ class Script:
         with open(path, "wb") as f:
             pickle.dump(self, f)
 
-    def sanity(self, rules: List[Callable]):
+    def sanity(self, rules: List[Callable], jobs: int = 1):
         """Utility for checking a batch of sanity rules on different elements
         of the stored graph (see
         `zoti_graph.appgraph.AppGraph.sanity()
@@ -111,6 +148,18 @@ class Script:
         * ``node_[name]`` are applied only on regular nodes;
         * in all other cases it applies the rule on the entire graph
           (i.e., the root node).
+
+        All the rules are checked in a single traversal of the graph,
+        within a :meth:`zoti_graph.appgraph.AppGraph.frozen` context,
+        thus any facts the rules derive from the graph are computed
+        only once. If *jobs* is greater than 1, the nodes (along with
+        their ports and outgoing edges) are checked in that many
+        worker processes, in which case the rules need to be
+        picklable, i.e., defined at module level.
+
+        All violations are collected and reported together as a
+        :class:`zoti_graph.exceptions.SanityError`.
+
         """
         log.info(f"*** Verifying sanity rules for graph {self.G.root}***")
 
@@ -120,24 +169,31 @@ class Script:
         graph_rules = [r for r in rules if r not in
                        port_rules + node_rules + edge_rules]
 
-        def _check(collection, *element):
-            for rule in collection:
-                self.G.sanity(rule, *element)
-
-        for edge in self.G.only_graph().edges:
-            _check(edge_rules, *edge)
-        log.info(f"  - passed {[f.__name__ for f in edge_rules]}")
-
-        for node in self.G.ir.nodes:
-            if isinstance(self.G.entry(node), Port):
-                _check(port_rules, node,)
+        nodes = list(self.G.ir.nodes)
+        args = (self.G, edge_rules, port_rules, node_rules)
+        with self.G.frozen():
+            if jobs > 1 and len(nodes) > 1:
+                size = -(-len(nodes) // (4 * jobs))
+                shards = [nodes[i:i + size] for i in range(0, len(nodes), size)]
+                with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                         initargs=args) as pool:
+                    found = list(pool.map(_check_worker_shard, shards))
             else:
-                _check(node_rules, node)
-        log.info(
-            f"  - passed {[f.__name__ for f in port_rules + node_rules]}")
-
-        _check(graph_rules, self.G.root)
-        log.info(f"  - passed {[f.__name__ for f in graph_rules]}")
+                found = [_check_shard(*args, nodes)]
+
+            violations = [(rule, element) for kind in ["edge", "node"]
+                          for shard in found for rule, element in shard[kind]]
+            for rule in graph_rules:
+                try:
+                    rule(self.G, self.G.root)
+                except AssertionError:
+                    violations.append((rule, (self.G.root,)))
+
+        failed = {rule for rule, _ in violations}
+        log.info(f"  - passed {[f.__name__ for f in rules if f not in failed]}")
+        if violations:
+            raise SanityError([self.G._sanity_error(rule, *element)
+                               for rule, element in violations])
 
     def transform(self, rules: List[TransSpec]):
         """Applies a sequence of graph transformation rules, each wrapped in a
@@ -0,0 +1,785 @@
+from array import array
+from collections.abc import ItemsView, Mapping, MutableMapping
+from typing import Any, List, Tuple, Optional, Dict
+
+import networkx as nx
+
+import zoti_graph.core as ty
+
+
+class _Missing:
+    # sentinel which survives pickling, e.g., in CompactDiGraph tables
+    def __reduce__(self):
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+class IndexedDiGraph(nx.DiGraph):
+    """NetworkX digraph which keeps an index of its hierarchy edges
+    (see :class:`zoti_graph.core.Rel`), i.e., the parents, children
+    and ports of each node, consistent with all the structural changes
+    made through the NetworkX API. Used as the internal representation
+    of :class:`zoti_graph.appgraph.AppGraph`, which answers hierarchy queries from this
+    index instead of filtering the adjacent edges of a node.
+
+    The hierarchy is also numbered in depth-first order (i.e., an
+    Euler tour following the first parent of each node), such that
+    the descendants of a node occupy a contiguous interval. This
+    numbering answers ancestry queries in constant time and enumerates
+    subtrees in time proportional to their size. It is dropped
+    whenever the hierarchy changes and it is redone lazily, once the
+    queries answered meanwhile by walking up the parents add up to
+    the cost of renumbering the entire graph.
+
+    Finally, the components connected through (undirected) GRAPH
+    edges are kept as a union-find structure with the members of
+    each component. Adding edges merges components on the fly,
+    whereas removing edges drops the structure, which is then rebuilt
+    at the next query.
+
+    *ATTENTION:* the relation of an edge should only be changed by
+    adding the edge anew, not by altering its attributes in place.
+
+    """
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        # ordered sets (i.e., dicts without values), same order as edges
+        self._parents: Dict[Any, Dict] = {}
+        self._children: Dict[Any, Dict] = {}
+        self._ports: Dict[Any, Dict] = {}
+        # depth-first numbering: node -> (first, end) interval in _order
+        self._tour: Optional[Dict[Any, Tuple[int, int]]] = None
+        self._order: List = []
+        self._walked = 0  # parents walked since the last numbering
+        # union-find over GRAPH edges: node -> parent (for non-roots)
+        self._uf: Optional[Dict] = None
+        self._members: Dict[Any, List] = {}  # root -> component (if > 1)
+        super().__init__(incoming_graph_data, **attr)
+
+    def _relation(self, u, v, default=None):
+        try:
+            return self._succ[u][v].get(ty.ATTR_REL)
+        except KeyError:
+            return default
+
+    def _link(self, u, v, rel):
+        if not isinstance(rel, ty.Rel) or not rel & ty.Rel.TREE:
+            return
+        self._parents.setdefault(v, {})[u] = None
+        self._tour = None
+        if rel == ty.Rel.CHILD:
+            self._children.setdefault(u, {})[v] = None
+        elif rel == ty.Rel.PORT:
+            self._ports.setdefault(u, {})[v] = None
+
+    def _unlink(self, u, v):
+        if self._parents.get(v, {}).pop(u, _MISSING) is not _MISSING:
+            self._tour = None
+        self._children.get(u, {}).pop(v, None)
+        self._ports.get(u, {}).pop(v, None)
+
+    def _relink(self, u, v, old):
+        # new edges are appended to the index, same as to the adjacency
+        # lists, whereas existing edges keep their adjacency position
+        new = self._relation(u, v)
+        if new == ty.Rel.GRAPH and old != ty.Rel.GRAPH:
+            self._union(u, v)
+        elif old == ty.Rel.GRAPH and new != ty.Rel.GRAPH:
+            self._uf = None
+        if old is _MISSING:
+            self._link(u, v, new)
+        elif new != old:
+            def _select(adj, test):
+                return {n: None for n, d in adj.items() if test(d.get(ty.ATTR_REL))}
+
+            def _is(rel):
+                return lambda r: r == rel
+
+            def _is_tree(r):
+                return isinstance(r, ty.Rel) and bool(r & ty.Rel.TREE)
+
+            self._parents[v] = _select(self._pred[v], _is_tree)
+            self._children[u] = _select(self._succ[u], _is(ty.Rel.CHILD))
+            self._ports[u] = _select(self._succ[u], _is(ty.Rel.PORT))
+            self._tour = None
+
+    def _descend(self, top, seen, order, tour=None):
+        # appends the tree under top in depth-first order, following the
+        # first parents, and numbers it in tour (if given)
+        stack = [(top, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                tour[node] = (tour[node], len(order))
+                continue
+            order.append(node)
+            if tour is not None:
+                tour[node] = len(order) - 1
+                stack.append((node, True))
+            for child in reversed(self._below(node)):
+                if child not in seen and self.tree_parent(child) == node:
+                    seen.add(child)
+                    stack.append((child, False))
+
+    def _renumber(self):
+        tour, order, seen = {}, [], set()
+        # roots first, then the leftovers from cycles
+        for top in [n for n in self._succ if self.tree_parent(n) is None] + list(self._succ):
+            if top not in seen:
+                seen.add(top)
+                self._descend(top, seen, order, tour)
+        self._tour, self._order, self._walked = tour, order, 0
+
+    def _below(self, n) -> List:
+        return [*self._children.get(n, ()), *self._ports.get(n, ())]
+
+    def _graph_edges(self):
+        return ((u, v) for u, v, rel in self.edges(data=ty.ATTR_REL)
+                if rel == ty.Rel.GRAPH)
+
+    def _find(self, n):
+        uf = self._uf
+        root = n
+        while root in uf:
+            root = uf[root]
+        while n in uf:  # path compression
+            uf[n], n = root, uf[n]
+        return root
+
+    def _union(self, u, v):
+        if self._uf is None:
+            return
+        this, that = self._find(u), self._find(v)
+        if this == that:
+            return
+        this_m = self._members.pop(this, None) or [this]
+        that_m = self._members.pop(that, None) or [that]
+        if len(this_m) < len(that_m):
+            this, that, this_m, that_m = that, this, that_m, this_m
+        self._uf[that] = this
+        this_m += that_m
+        self._members[this] = this_m
+
+    def graph_component(self, n) -> List:
+        """Returns all the nodes connected to *n* through GRAPH edges,
+        regardless of their direction, including *n*."""
+        if self._uf is None:
+            self._uf, self._members = {}, {}
+            for u, v in self._graph_edges():
+                self._union(u, v)
+        root = self._find(n)
+        return list(self._members.get(root, [root]))
+
+    def tree_parents(self, n) -> List:
+        """Returns the nodes *n* is a child or a port of."""
+        return list(self._parents.get(n, ()))
+
+    def tree_parent(self, n):
+        """Returns the first node *n* is a child or a port of, or None."""
+        return next(iter(self._parents.get(n, ())), None)
+
+    def tree_has_ancestor(self, n, ancestor) -> bool:
+        """Checks if *ancestor* is found up the (first) parents of *n*."""
+        if self._tour is None and self._walked > len(self._succ):
+            self._renumber()
+        if self._tour is not None:
+            this, that = self._tour.get(n), self._tour.get(ancestor)
+            if this is not None and that is not None:
+                return that[0] < this[0] < that[1]
+        parent = self.tree_parent(n)
+        while parent is not None:
+            self._walked += 1
+            if parent == ancestor:
+                return True
+            parent = self.tree_parent(parent)
+        return False
+
+    def tree_descendants(self, n) -> List:
+        """Returns all the nodes under *n* in the hierarchy (i.e., having
+        *n* as ancestor, see :meth:`tree_has_ancestor`) in depth-first
+        order."""
+        if self._tour is not None and n in self._tour:
+            first, end = self._tour[n]
+            return self._order[first + 1: end]
+        order = []
+        if n in self._succ:
+            self._descend(n, {n}, order)
+        return order[1:]
+
+    def tree_children(self, n) -> List:
+        """Returns the children of node *n*."""
+        return list(self._children.get(n, ()))
+
+    def tree_ports(self, n) -> List:
+        """Returns the ports of node *n*."""
+        return list(self._ports.get(n, ()))
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        old = self._relation(u_of_edge, v_of_edge, _MISSING)
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._relink(u_of_edge, v_of_edge, old)
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        edges = list(ebunch_to_add)
+        old = {}
+        for e in edges:
+            if len(e) in (2, 3) and tuple(e[:2]) not in old:
+                old[tuple(e[:2])] = self._relation(*e[:2], _MISSING)
+        super().add_edges_from(edges, **attr)
+        for (u, v), rel in old.items():
+            self._relink(u, v, rel)
+
+    def remove_edge(self, u, v):
+        rel = self._relation(u, v)
+        super().remove_edge(u, v)
+        self._unlink(u, v)
+        if rel == ty.Rel.GRAPH:
+            self._uf = None
+
+    def remove_edges_from(self, ebunch):
+        for e in ebunch:
+            u, v = e[:2]
+            if u in self._succ and v in self._succ[u]:
+                self.remove_edge(u, v)
+
+    def remove_node(self, n):
+        if self._uf is not None and n in self._succ:
+            if any(d.get(ty.ATTR_REL) == ty.Rel.GRAPH
+                   for adj in (self._succ[n], self._pred[n]) for d in adj.values()):
+                self._uf = None
+            else:
+                self._members.pop(n, None)
+        super().remove_node(n)
+        if self._parents.get(n) or self._children.get(n) or self._ports.get(n):
+            self._tour = None
+        for parent in self._parents.pop(n, ()):
+            self._children.get(parent, {}).pop(n, None)
+            self._ports.get(parent, {}).pop(n, None)
+        for child in [*self._children.pop(n, ()), *self._ports.pop(n, ())]:
+            self._parents.get(child, {}).pop(n, None)
+
+    def remove_nodes_from(self, nodes):
+        for n in list(nodes):
+            if n in self._succ:
+                self.remove_node(n)
+
+    def clear(self):
+        super().clear()
+        self._parents, self._children, self._ports = {}, {}, {}
+        self._tour, self._uf = None, None
+
+    def clear_edges(self):
+        super().clear_edges()
+        self._parents, self._children, self._ports = {}, {}, {}
+        self._tour, self._uf = None, None
+
+
+# relations with dedicated adjacency arrays in CompactDiGraph, indexed by kind
+_KINDS = (ty.Rel.CHILD, ty.Rel.PORT, ty.Rel.GRAPH)
+_CHILD, _PORT, _GRAPH, _OTHER = range(4)
+# neighbors of a node kept in an array up to this many, in an ordered set beyond
+_WIDE = 16
+
+
+def _kind(rel) -> int:
+    try:
+        return _KINDS.index(rel)
+    except ValueError:
+        return _OTHER
+
+
+class _NodeData(MutableMapping):
+    # attributes of node i, as stored in the tables of graph g
+    __slots__ = ("_g", "_i")
+
+    def __init__(self, g, i):
+        self._g, self._i = g, i
+
+    def __getitem__(self, key):
+        if key == ty.ATTR_ENT:
+            value = self._g._entries[self._i]
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        return self._g._nattrs.get(self._i, {})[key]
+
+    def __setitem__(self, key, value):
+        if key == ty.ATTR_ENT:
+            self._g._entries[self._i] = value
+        else:
+            self._g._nattrs.setdefault(self._i, {})[key] = value
+
+    def __delitem__(self, key):
+        if key == ty.ATTR_ENT:
+            if self._g._entries[self._i] is _MISSING:
+                raise KeyError(key)
+            self._g._entries[self._i] = _MISSING
+        else:
+            extra = self._g._nattrs.get(self._i, {})
+            del extra[key]
+            if not extra:
+                del self._g._nattrs[self._i]
+
+    def __iter__(self):
+        if self._g._entries[self._i] is not _MISSING:
+            yield ty.ATTR_ENT
+        yield from list(self._g._nattrs.get(self._i, ()))
+
+    def __len__(self):
+        return ((self._g._entries[self._i] is not _MISSING)
+                + len(self._g._nattrs.get(self._i, ())))
+
+    def copy(self) -> Dict:
+        return dict(self)
+
+
+class _EdgeData(MutableMapping):
+    # attributes of edge (u, v) of kind k, as stored in the tables of graph g
+    __slots__ = ("_g", "_u", "_v", "_k")
+
+    def __init__(self, g, u, v, k):
+        self._g, self._u, self._v, self._k = g, u, v, k
+
+    def _key(self):
+        return self._u << 32 | self._v
+
+    def __getitem__(self, key):
+        if key == ty.ATTR_REL and self._k != _OTHER:
+            return _KINDS[self._k]
+        if key == ty.ATTR_ENT:
+            return self._g._eentries[self._key()]
+        return self._g._eattrs.get(self._key(), {})[key]
+
+    def __setitem__(self, key, value):
+        self._g._set_edge(self._u, self._v, {key: value})
+        self._k = self._g._find_kind(self._u, self._v)
+
+    def __delitem__(self, key):
+        if key == ty.ATTR_REL and self._k != _OTHER:
+            # the edge is left without a relation
+            self._g._move_edge(self._u, self._v, self._k, _OTHER)
+            self._k = _OTHER
+        elif key == ty.ATTR_ENT:
+            del self._g._eentries[self._key()]
+        else:
+            extra = self._g._eattrs.get(self._key(), {})
+            del extra[key]
+            if not extra:
+                del self._g._eattrs[self._key()]
+
+    def __iter__(self):
+        if self._k != _OTHER:
+            yield ty.ATTR_REL
+        if self._key() in self._g._eentries:
+            yield ty.ATTR_ENT
+        yield from list(self._g._eattrs.get(self._key(), ()))
+
+    def __len__(self):
+        return ((self._k != _OTHER) + (self._key() in self._g._eentries)
+                + len(self._g._eattrs.get(self._key(), ())))
+
+    def copy(self) -> Dict:
+        return dict(self)
+
+
+class _Nodes(Mapping):
+    # node -> attributes, i.e., the node table of graph g
+    __slots__ = ("_g",)
+
+    def __init__(self, g):
+        self._g = g
+
+    def __getitem__(self, n):
+        return _NodeData(self._g, self._g._ids[n])
+
+    def __setitem__(self, n, attrs):
+        i = self._g._intern(n)
+        self._g._entries[i] = _MISSING
+        self._g._nattrs.pop(i, None)
+        self._g._set_node(i, attrs)
+
+    def update(self, items):
+        for n, attrs in items.items() if isinstance(items, Mapping) else items:
+            self[n] = attrs
+
+    def __contains__(self, n):
+        return n in self._g._ids
+
+    def __iter__(self):
+        return (n for n in self._g._uids if n is not None)
+
+    def __len__(self):
+        return len(self._g._ids)
+
+
+class _Neighbors(Mapping):
+    # neighbor -> edge attributes, for the successors or predecessors of
+    # node i in graph g
+    __slots__ = ("_g", "_i", "_succ", "_adj")
+
+    def __init__(self, g, i, succ):
+        self._g, self._i, self._succ = g, i, succ
+        self._adj = g._succs if succ else g._preds
+
+    def _edge(self, j, k):
+        if self._succ:
+            return _EdgeData(self._g, self._i, j, k)
+        return _EdgeData(self._g, j, self._i, k)
+
+    def __getitem__(self, n):
+        j = self._g._ids.get(n)
+        if j is not None:
+            for k, adj in enumerate(self._adj):
+                if adj[self._i] is not None and j in adj[self._i]:
+                    return self._edge(j, k)
+        raise KeyError(n)
+
+    def __contains__(self, n):
+        j = self._g._ids.get(n)
+        return j is not None and any(
+            adj[self._i] is not None and j in adj[self._i] for adj in self._adj)
+
+    def __iter__(self):
+        uids = self._g._uids
+        for adj in self._adj:
+            yield from [uids[j] for j in adj[self._i] or ()]
+
+    def __len__(self):
+        return sum(len(adj[self._i] or ()) for adj in self._adj)
+
+    def items(self):
+        return _NeighborItems(self)
+
+
+class _NeighborItems(ItemsView):
+    def __iter__(self):
+        nbrs = self._mapping
+        uids = nbrs._g._uids
+        for k, adj in enumerate(nbrs._adj):
+            yield from [(uids[j], nbrs._edge(j, k)) for j in adj[nbrs._i] or ()]
+
+
+class _Adjacency(Mapping):
+    # node -> neighbors, for the successors or predecessors in graph g
+    __slots__ = ("_g", "_succ")
+
+    def __init__(self, g, succ):
+        self._g, self._succ = g, succ
+
+    def __getitem__(self, n):
+        return _Neighbors(self._g, self._g._ids[n], self._succ)
+
+    def __contains__(self, n):
+        return n in self._g._ids
+
+    def __iter__(self):
+        return (n for n in self._g._uids if n is not None)
+
+    def __len__(self):
+        return len(self._g._ids)
+
+
+class CompactDiGraph(IndexedDiGraph):
+    """Variant of :class:`IndexedDiGraph` with a compact storage, meant
+    for large graphs, e.g., with hundreds of thousands of ports, where
+    the dictionaries kept by NetworkX for each node and edge take up
+    most of the memory.
+
+    Each node is interned once in a table mapping it to an integer
+    ID, and the graph is stored in terms of these IDs: the node
+    entries in a list and the adjacency of each node as integer
+    arrays, split by relation (i.e., one array for each of CHILD, PORT
+    and GRAPH and one for the edges of any other relation). Arrays
+    which grow large, e.g., the children of a node with many
+    children, are turned into ordered sets instead. Edge entries are
+    kept in a table keyed by the IDs of their ends, and only the
+    (rarely used) attributes other than the relation and the entry
+    are stored in dictionaries. The hierarchy and connectivity
+    queries are answered directly from the arrays.
+
+    The graph is still a NetworkX digraph, i.e., all NetworkX
+    algorithms and views can be applied on it, with the node and edge
+    attribute dictionaries created on demand as proxies to the tables
+    above. For algorithms which visit the graph many times, it might
+    be faster to run them on a regular copy obtained with
+    :meth:`to_networkx`.
+
+    Unlike :class:`IndexedDiGraph`, the neighbors of a node are
+    ordered by relation first, an edge whose relation changes is moved
+    last among the edges of its new relation, and the IDs of removed
+    nodes are not reused. The parents of a node (i.e., over CHILD and
+    PORT edges) are kept in a single array though, in the order of
+    their edges, thus both classes agree on the first parent of a node
+    and on the hierarchy queries following it.
+
+    """
+
+    _STATE = ("graph", "_ids", "_uids", "_entries", "_nattrs",
+              "_succs", "_preds", "_parents", "_eentries", "_eattrs")
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        self._tour: Optional[Dict[Any, Tuple[int, int]]] = None
+        self._order: List = []
+        self._walked = 0
+        self._uf: Optional[Dict] = None
+        self._members: Dict[Any, List] = {}
+        self._reset()
+        self.graph = {}
+        self._node = _Nodes(self)
+        self._adj = _Adjacency(self, True)
+        self._pred = _Adjacency(self, False)
+        self.__networkx_cache__ = {}
+        if incoming_graph_data is not None:
+            nx.convert.to_networkx_graph(incoming_graph_data, create_using=self)
+        attr.pop("backend", None)
+        self.graph.update(attr)
+
+    def __getstate__(self):
+        return {name: self.__dict__[name] for name in self._STATE}
+
+    def _clear_cache(self):
+        # results cached by NetworkX (from version 3.3) for this graph
+        self.__networkx_cache__.clear()
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def _reset(self, edges_only=False):
+        if not edges_only:
+            self._ids: Dict[Any, int] = {}  # interned node -> ID
+            self._uids: List = []  # ID -> node, None if removed
+            self._entries: List = []  # ID -> node entry
+            self._nattrs: Dict[int, Dict] = {}  # ID -> other node attributes
+        # kind -> ID -> successors/predecessors as array or ordered set
+        # (i.e., dict) of IDs, or None if empty
+        self._succs: List[List] = [[None] * len(self._uids) for _ in range(4)]
+        self._preds: List[List] = [[None] * len(self._uids) for _ in range(4)]
+        # ID -> CHILD and PORT predecessors, in the order of their edges
+        self._parents: List = [None] * len(self._uids)
+        # (u << 32 | v) -> edge entry / other edge attributes
+        self._eentries: Dict[int, Any] = {}
+        self._eattrs: Dict[int, Dict] = {}
+        self._tour, self._uf = None, None
+
+    def _intern(self, n) -> int:
+        i = self._ids.get(n)
+        if i is None:
+            if n is None:
+                raise ValueError("None cannot be a node")
+            i = len(self._uids)
+            self._ids[n] = i
+            self._uids.append(n)
+            self._entries.append(_MISSING)
+            for adj in self._succs + self._preds + [self._parents]:
+                adj.append(None)
+        return i
+
+    def _set_node(self, i, attrs):
+        for key, value in attrs.items():
+            if key == ty.ATTR_ENT:
+                self._entries[i] = value
+            else:
+                self._nattrs.setdefault(i, {})[key] = value
+
+    def _find_kind(self, u, v) -> Optional[int]:
+        for k, adj in enumerate(self._succs):
+            if adj[u] is not None and v in adj[u]:
+                return k
+        return None
+
+    def _attach(self, k, u, v):
+        self._attach_one(self._succs[k], u, v)
+        self._attach_one(self._preds[k], v, u)
+
+    @staticmethod
+    def _attach_one(adj, this, that):
+        nbrs = adj[this]
+        if nbrs is None:
+            adj[this] = array("i", (that,))
+        elif isinstance(nbrs, dict):
+            nbrs[that] = None
+        elif len(nbrs) < _WIDE:
+            nbrs.append(that)
+        else:
+            adj[this] = dict.fromkeys([*nbrs, that])
+
+    def _detach(self, k, u, v):
+        self._detach_one(self._succs[k], u, v)
+        self._detach_one(self._preds[k], v, u)
+
+    @staticmethod
+    def _detach_one(adj, this, that):
+        nbrs = adj[this]
+        if isinstance(nbrs, dict):
+            del nbrs[that]
+        else:
+            nbrs.remove(that)
+        if not nbrs:
+            adj[this] = None
+
+    def _move_edge(self, u, v, old, new):
+        if old is not None:
+            self._detach(old, u, v)
+        if new is not None:
+            self._attach(new, u, v)
+        if {old, new} & {_CHILD, _PORT}:
+            self._tour = None
+            if old not in (_CHILD, _PORT):
+                self._attach_one(self._parents, v, u)
+            elif new not in (_CHILD, _PORT):
+                self._detach_one(self._parents, v, u)
+        if new == _GRAPH:
+            self._union(self._uids[u], self._uids[v])
+        elif old == _GRAPH:
+            self._uf = None
+
+    def _set_edge(self, u, v, attrs):
+        key = u << 32 | v
+        old = self._find_kind(u, v)
+        new = _OTHER if old is None else old
+        if ty.ATTR_REL in attrs:
+            new = _kind(attrs[ty.ATTR_REL])
+        if new != old:
+            self._move_edge(u, v, old, new)
+        for name, value in attrs.items():
+            if name == ty.ATTR_ENT:
+                self._eentries[key] = value
+            elif name != ty.ATTR_REL or new == _OTHER:
+                self._eattrs.setdefault(key, {})[name] = value
+        if old == _OTHER and new != _OTHER and key in self._eattrs:
+            self._eattrs[key].pop(ty.ATTR_REL, None)
+            if not self._eattrs[key]:
+                del self._eattrs[key]
+
+    def _forget_edge(self, u, v):
+        self._eentries.pop(u << 32 | v, None)
+        self._eattrs.pop(u << 32 | v, None)
+
+    def _below(self, n) -> List:
+        return self.tree_children(n) + self.tree_ports(n)
+
+    def _graph_edges(self):
+        uids = self._uids
+        for u, succ in enumerate(self._succs[_GRAPH]):
+            if succ is not None:
+                yield from [(uids[u], uids[v]) for v in succ]
+
+    def _related(self, n, adj) -> List:
+        i = self._ids.get(n)
+        if i is None or adj[i] is None:
+            return []
+        return [self._uids[j] for j in adj[i]]
+
+    def tree_parents(self, n) -> List:
+        return self._related(n, self._parents)
+
+    def tree_parent(self, n):
+        i = self._ids.get(n)
+        if i is None or self._parents[i] is None:
+            return None
+        return self._uids[next(iter(self._parents[i]))]
+
+    def tree_children(self, n) -> List:
+        return self._related(n, self._succs[_CHILD])
+
+    def tree_ports(self, n) -> List:
+        return self._related(n, self._succs[_PORT])
+
+    def to_networkx(self) -> IndexedDiGraph:
+        """Returns a copy of this graph stored as a regular NetworkX
+        digraph (i.e., an :class:`IndexedDiGraph`), sharing the same
+        node and edge entries."""
+        return IndexedDiGraph(self)
+
+    def add_node(self, node_for_adding, **attr):
+        self._set_node(self._intern(node_for_adding), attr)
+        self._clear_cache()
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        for n in nodes_for_adding:
+            try:
+                n in self._ids
+                attrs = attr
+            except TypeError:
+                n, ndict = n
+                attrs = {**attr, **ndict}
+            self._set_node(self._intern(n), attrs)
+        self._clear_cache()
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        u, v = self._intern(u_of_edge), self._intern(v_of_edge)
+        self._set_edge(u, v, attr)
+        self._clear_cache()
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        for e in ebunch_to_add:
+            if len(e) == 3:
+                u, v, dd = e
+            elif len(e) == 2:
+                (u, v), dd = e, {}
+            else:
+                raise nx.NetworkXError(f"Edge tuple {e} must be a 2-tuple or 3-tuple.")
+            self._set_edge(self._intern(u), self._intern(v), {**attr, **dd})
+        self._clear_cache()
+
+    def remove_edge(self, u, v):
+        ui, vi = self._ids.get(u), self._ids.get(v)
+        kind = None if ui is None or vi is None else self._find_kind(ui, vi)
+        if kind is None:
+            raise nx.NetworkXError(f"The edge {u}-{v} not in graph.")
+        self._move_edge(ui, vi, kind, None)
+        self._forget_edge(ui, vi)
+        self._clear_cache()
+
+    def remove_edges_from(self, ebunch):
+        for e in ebunch:
+            u, v = e[:2]
+            if self.has_edge(u, v):
+                self.remove_edge(u, v)
+
+    def remove_node(self, n):
+        i = self._ids.get(n)
+        if i is None:
+            raise nx.NetworkXError(f"The node {n} is not in the digraph.")
+        for k in range(4):
+            succ, pred = self._succs[k][i], self._preds[k][i]
+            if (succ or pred) and k in (_CHILD, _PORT):
+                self._tour = None
+            if (succ or pred) and k == _GRAPH:
+                self._uf = None
+            for j in succ or ():
+                if j != i:
+                    self._detach_one(self._preds[k], j, i)
+                    if k in (_CHILD, _PORT):
+                        self._detach_one(self._parents, j, i)
+                self._forget_edge(i, j)
+            for j in pred or ():
+                if j != i:
+                    self._detach_one(self._succs[k], j, i)
+                self._forget_edge(j, i)
+            self._succs[k][i] = self._preds[k][i] = None
+        self._parents[i] = None
+        if self._uf is not None:
+            self._members.pop(n, None)
+        del self._ids[n]
+        self._uids[i] = None
+        self._entries[i] = _MISSING
+        self._nattrs.pop(i, None)
+        self._clear_cache()
+
+    def remove_nodes_from(self, nodes):
+        for n in list(nodes):
+            if n in self._ids:
+                self.remove_node(n)
+
+    def clear(self):
+        self.graph.clear()
+        self._reset()
+        self._clear_cache()
+
+    def clear_edges(self):
+        self._reset(edges_only=True)
+        self._clear_cache()
@@ -9,6 +9,7 @@ import networkx as nx
 sys.path.insert(0, "src")
 import zoti_graph.io as io
 from zoti_graph.core import Uid
+from zoti_graph import genny
 from zoti_graph.genny import parse, Dir, BasicNode, CompositeNode
 from zoti_graph.genny.sanity import (
     node_consistent_tree,
@@ -140,3 +141,144 @@ def test_scenario1() -> None:
         os.remove("tmp.dot")
         os.remove("tmp.json")
         pass
+
+
+def test_hierarchy_index() -> None:
+    from zoti_graph.core import ATTR_REL, Rel
+
+    def _filtered(G, n):
+        return ([u for u, v in G.ir.in_edges(n) if G.ir[u][v][ATTR_REL] & Rel.TREE],
+                [v for u, v in G.ir.out_edges(n) if G.ir[u][v][ATTR_REL] == Rel.CHILD],
+                [v for u, v in G.ir.out_edges(n) if G.ir[u][v][ATTR_REL] == Rel.PORT])
+
+    with open("tests/inputs/graph1.yaml") as f:
+        G = parse(*yaml.load_all(f, Loader=yaml.Loader))
+    G.new(Uid("Tst/clust"), CompositeNode("testclus", {}, {}))
+    G.register_child(Uid("Tst"), Uid("Tst/clust"))
+    G.cluster(Uid("Tst/clust"), [Uid("Tst/Src"), Uid("Tst/streamq")])
+    G.uncluster(Uid("Tst/clust"))
+    G.fuse_nodes(Uid("Tst/streamq/release_data"), Uid("Tst/streamq/queue_data"))
+    # changing the relation of an existing edge keeps its position
+    port = G.ports(Uid("Tst/Src"))[0]
+    G.ir.add_edge(Uid("Tst/Src"), port, **{ATTR_REL: Rel.GRAPH})
+    G.ir.add_edge(Uid("Tst/Src"), port, **{ATTR_REL: Rel.PORT})
+    below = G.ir.tree_descendants(Uid("Tst/Src"))
+    assert Uid("Tst/Src/counter/buffer-flush/_kern/^flush_cnt") in below
+    G.remove_tree(Uid("Tst/Src/counter"))
+    for n in G.ir.nodes:
+        up, parent = [], G.parent(n)
+        while parent is not None:
+            up.append(parent)
+            parent = G.parent(parent)
+        assert all(G.has_ancestor(n, a) == (a in up) for a in G.ir.nodes)
+        assert set(G.ir.tree_descendants(n)) == {m for m in G.ir.nodes if G.has_ancestor(m, n)}
+        parents, children, ports = _filtered(G, n)
+        assert G.parent(n) == (parents[0] if parents else None)
+        assert G.children(n) == children
+        assert G.ports(n) == ports
+    assert G.ports(Uid("Tst/Src"))[0] == port
+    assert not G.ir.has_node(Uid("Tst/Src/counter/buffer-flush"))
+    try:
+        G.children(Uid("Tst/Src/counter"))
+        assert False
+    except KeyError:
+        pass
+
+
+def test_connected_ports() -> None:
+    def _component(G, port):
+        graph = G.only_graph().to_undirected()
+        return set(nx.node_connected_component(graph, port))
+
+    with open("tests/inputs/graph1.yaml") as f:
+        G = parse(*yaml.load_all(f, Loader=yaml.Loader))
+    port = Uid("Tst/Src/counter/^monitored_input")
+    conn = G.connected_ports(port)
+    assert set(conn.nodes) == _component(G, port)
+    assert set(G.end_ports(port, graph=conn)) == set(G.end_ports(port))
+    # components are split by removals and merged by additions
+    G.bypass_port(Uid("Tst/Src/counter/buffer-flush/^cnt_buff"))
+    G.ir.remove_edge(*next(iter(conn.edges)))
+    for p in list(conn.nodes):
+        assert set(G.connected_ports(p).nodes) == _component(G, p)
+    G.connect(port, Uid("Tst/streamq/^ldata"), recursive=False)
+    assert set(G.connected_ports(port).nodes) == _component(G, port)
+    assert Uid("Tst/streamq/^ldata") in G.connected_ports(port)
+
+
+def test_sanity_batch() -> None:
+    from zoti_graph.exceptions import EntryError, SanityError
+    from zoti_graph.genny.sanity import edge_sibling_kind, port_dangling
+    from zoti_graph.script import Script
+
+    rules = [port_dangling, node_consistent_tree, node_actor_consistency,
+             edge_direction, edge_hierarchy, edge_sibling_kind]
+    with open("tests/inputs/graph1.yaml") as f:
+        G = parse(*yaml.load_all(f, Loader=yaml.Loader))
+    G.copy_tree(Uid("Tst/Src"), "Src2")  # copied ports are left dangling
+
+    expected = []
+    for rule in rules:
+        kind = rule.__name__.split("_")[0]
+        elements = (G.only_graph().edges if kind == "edge" else
+                    [n for n in G.ir.nodes if (kind == "port") ==
+                     isinstance(G.entry(n), genny.Port)])
+        for element in elements:
+            try:
+                G.sanity(rule, *(element if kind == "edge" else [element]))
+            except EntryError as e:
+                expected.append(str(e))
+
+    for jobs in [1, 2]:
+        try:
+            Script(G).sanity(rules, jobs=jobs)
+            assert False, "violations not reported"
+        except SanityError as e:
+            assert sorted(str(v) for v in e.violations) == sorted(expected)
+    assert len(expected) > 1
+
+
+def test_compact_storage() -> None:
+    import io as sio
+    import pickle
+    from zoti_graph.core import ATTR_REL, Rel
+    from zoti_graph.storage import CompactDiGraph
+
+    def _state(G):
+        return ({n: (G.parent(n), G.children(n), G.ports(n), G.entry(n).name)
+                 for n in G.ir.nodes},
+                {(u, v, d[ATTR_REL]) for u, v, d in G.ir.edges(data=True)})
+
+    with open("tests/inputs/graph1.yaml") as f:
+        raw = sio.StringIO()
+        io.dump_raw(parse(*yaml.load_all(f, Loader=yaml.Loader)), raw)
+    graphs = []
+    for compact in [False, True]:
+        raw.seek(0)
+        G = io.from_raw(raw, compact=compact)
+        G.new(Uid("Tst/clust"), CompositeNode("testclus", {}, {}))
+        G.register_child(Uid("Tst"), Uid("Tst/clust"))
+        G.cluster(Uid("Tst/clust"), [Uid("Tst/Src"), Uid("Tst/streamq")])
+        G.copy_tree(Uid("Tst/Src"), "Src2")
+        G.uncluster(Uid("Tst/clust"))
+        G.remove_tree(Uid("Tst/Src/counter"))
+        graphs.append(G)
+    G = graphs[1]
+    assert isinstance(G.ir, CompactDiGraph)
+    assert _state(G) == _state(graphs[0])
+    assert _state(pickle.loads(pickle.dumps(G))) == _state(G)
+    assert nx.is_isomorphic(G.ir.to_networkx(), graphs[0].ir)
+    assert (set(G.only_graph(with_ports=False).edges)
+            == set(graphs[0].only_graph(with_ports=False).edges))
+
+    # both backends follow the first tree edge of a node with several parents
+    from zoti_graph.storage import IndexedDiGraph
+    trees = []
+    for cls in [IndexedDiGraph, CompactDiGraph]:
+        T = cls()
+        T.add_edge("a", "x", **{ATTR_REL: Rel.PORT})
+        T.add_edge("b", "x", **{ATTR_REL: Rel.CHILD})
+        T.add_edge("r", "b", **{ATTR_REL: Rel.CHILD})
+        trees.append((T.tree_parent("x"), T.tree_parents("x"),
+                      T.tree_has_ancestor("x", "r"), T.tree_descendants("b")))
+    assert trees[0] == trees[1] == ("a", ["a", "b"], False, [])
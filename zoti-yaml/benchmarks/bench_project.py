@@ -0,0 +1,190 @@
+"""Measures the time spent by ZOTI-YAML on synthetic projects for each
+processing stage: loading (:meth:`zoti_yaml.Project.load_module`),
+building (:meth:`zoti_yaml.Project.build`) and dumping the main module
+in each output format. Every parameter accepts several values, in
+which case all their combinations are measured. Usage::
+
+    python benchmarks/bench_project.py --modules 10 50 --fanout 3 \\
+        --attach 0.2 --depth 2 --size 100 --repeat 5 -o results.json
+
+The generated projects are made of modules ``mod0`` ... ``modN``,
+where ``mod0`` is the main module and each module imports the next
+*fanout* ones. Each module document consists of *size* nodes, out of
+which a fraction *attach* are ``!attach`` nodes referencing plain
+nodes in the imported modules. The data of each plain node is merged
+with ``!default`` from trees nested *depth* levels deep.
+
+The results are written as JSON to the output file (if given), along
+with the version of ZOTI-YAML and the commit of the working tree, so
+that they can be compared across revisions.
+
+"""
+import argparse
+import io
+import itertools
+import json
+import logging as log
+import pickle
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+import zoti_yaml
+from zoti_yaml import Project, binary
+from zoti_yaml.dumper import ZotiDumper, ZotiEncoder
+
+KEYS = ["root", "nodes", "ports"]
+
+FORMATS = {
+    "json": lambda doc: json.dump(doc, io.StringIO(), indent=2, cls=ZotiEncoder),
+    "yaml": lambda doc: yaml.dump_all(doc, io.StringIO(), Dumper=ZotiDumper,
+                                      default_flow_style=None,
+                                      explicit_start=True, width=4096),
+    "pickle": lambda doc: pickle.dump(doc, io.BytesIO()),
+    "binary": lambda doc: binary.dump(doc, io.BytesIO()),
+}
+if binary.msgpack is None:  # needs zoti-yaml[binary]
+    del FORMATS["binary"]
+
+
+def _nested(depth, leaf):
+    tree = leaf
+    for level in reversed(range(depth)):
+        tree = {f"d{level}": tree}
+    return json.dumps(tree)
+
+
+def make_project(root: Path, modules: int, fanout: int, attach: float,
+                 depth: int, size: int, seed: int = 0) -> str:
+    """Creates the source files of a synthetic project in *root* (see
+    the module documentation) and returns the name of its main
+    module.
+
+    """
+    rng = random.Random(seed)
+    names = [f"mod{i}" for i in range(modules)]
+    imports = [names[i + 1: i + 1 + fanout] for i in range(modules)]
+    # the first node of each module is always plain, i.e., a valid target
+    attached = [{k for k in range(1, size) if rng.random() < attach}
+                if imports[i] else set() for i in range(modules)]
+    plain = {name: [k for k in range(size) if k not in attached[i]]
+             for i, name in enumerate(names)}
+
+    for i, name in enumerate(names):
+        lines = [f"module: {name}"]
+        if imports[i]:
+            lines.append("import:")
+            lines += [f"  - {{module: {dep}}}" for dep in imports[i]]
+        lines += ["---", "root:"]
+        for k in range(size):
+            if k in attached[i]:
+                dep = rng.choice(imports[i])
+                target = rng.choice(plain[dep])
+                lines.append(
+                    f"  - !attach {{ref: !ref {{module: {dep}, path: "
+                    f"\"/root[n{target}]\"}}, name: n{k}}}")
+                continue
+            lines += [f"  - name: n{k}",
+                      "    ports: [{name: i, kind: in}, {name: o, kind: out}]"]
+            if depth:
+                lines.append(
+                    f"    data: !default [{_nested(depth, {'kind': 'leaf', 'w': k})}, "
+                    f"{_nested(depth, {'v': k})}]")
+            else:
+                lines.append(f"    data: {{v: {k}, kind: leaf, w: {k}}}")
+            lines.append(f"    nodes: [{{name: n{k}_0, mark: {rng.random():.6f}}}]")
+        root.joinpath(f"{name}.zoml").write_text("\n".join(lines) + "\n")
+    return names[0]
+
+
+def _load(root: Path, main: str) -> Project:
+    proj = Project(keys=KEYS, pathvar=[root.as_posix()], ext=[".zoml"])
+    path = proj.resolve_path(main)
+    with open(path) as f:
+        proj.load_module(main, f, path)
+    return proj
+
+
+def run(root: Path, main: str, repeat: int) -> dict:
+    """Loads, builds and dumps the project in *root* *repeat* times and
+    returns the measured times (in seconds) for each stage."""
+    times = {"load": [], "build": [], **{f"dump_{fmt}": [] for fmt in FORMATS}}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proj = _load(root, main)
+        times["load"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for name in list(proj.modules):
+            proj.build(name)
+        times["build"].append(time.perf_counter() - start)
+
+        # as with zoml, only the binary format gets packed positions
+        doc = proj.modules[main].to_dump()
+        packed = proj.modules[main].to_dump(packed=True)
+        for fmt, dump in FORMATS.items():
+            start = time.perf_counter()
+            dump(packed if fmt == "binary" else doc)
+            times[f"dump_{fmt}"].append(time.perf_counter() - start)
+    return times
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", type=int, nargs="+", default=[10])
+    parser.add_argument("--fanout", type=int, nargs="+", default=[2])
+    parser.add_argument("--attach", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--depth", type=int, nargs="+", default=[2])
+    parser.add_argument("--size", type=int, nargs="+", default=[100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=Path,
+                        help="File where the results are written as JSON")
+    args = parser.parse_args()
+    log.basicConfig(level=log.WARNING)
+
+    cases = []
+    stages = ["load", "build"] + [f"dump_{fmt}" for fmt in FORMATS]
+    print(f"{'modules':>8} {'fanout':>7} {'attach':>7} {'depth':>6} {'size':>6}"
+          + "".join(f" {stage:>12}" for stage in stages) + "   (best, ms)")
+    for params in itertools.product(args.modules, args.fanout, args.attach,
+                                    args.depth, args.size):
+        case = dict(zip(["modules", "fanout", "attach", "depth", "size"], params))
+        with tempfile.TemporaryDirectory() as tmp:
+            main = make_project(Path(tmp), **case, seed=args.seed)
+            times = run(Path(tmp), main, args.repeat)
+        cases.append({"params": case, "results": {
+            stage: {"best": min(ts), "median": statistics.median(ts), "runs": ts}
+            for stage, ts in times.items()}})
+        print(f"{case['modules']:>8} {case['fanout']:>7} {case['attach']:>7} "
+              f"{case['depth']:>6} {case['size']:>6}"
+              + "".join(f" {min(times[stage]) * 1e3:>12.1f}" for stage in stages))
+
+    if args.output:
+        report = {
+            "tool": zoti_yaml.__fullname__,
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "cases": cases,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
@@ -0,0 +1,68 @@
+"""Measures the per-file overhead of loading a ZOTI-YAML project made
+of many small modules, i.e., the cost paid by the loader itself rather
+than by the size of the documents. Usage::
+
+    python benchmarks/bench_startup.py --modules 100 300 --repeat 5
+
+"""
+import argparse
+import logging as log
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from zoti_yaml import Project
+
+MODULE = """\
+module: {name}
+---
+nodes:
+  - name: {name}_a
+    ports: [{{name: i}}, {{name: o}}]
+  - name: {name}_b
+    nodes:
+      - name: leaf
+        data: !attach {{ref: !ref {{path: "../../../{name}_a"}}}}
+"""
+
+
+def make_project(root: Path, count: int) -> None:
+    """Creates *count* leaf modules and a ``main`` module importing all
+    of them in *root*."""
+    names = [f"mod{i}" for i in range(count)]
+    for name in names:
+        root.joinpath(f"{name}.zoml").write_text(MODULE.format(name=name))
+    imports = "\n".join(f"  - {{module: {name}}}" for name in names)
+    root.joinpath("main.zoml").write_text(
+        f"module: main\nimport:\n{imports}\n---\nnodes: []\n")
+
+
+def run(root: Path, repeat: int):
+    times = []
+    for _ in range(repeat):
+        proj = Project(keys=["nodes", "ports"], pathvar=[root.as_posix()],
+                       ext=[".zoml"])
+        start = time.perf_counter()
+        path = proj.resolve_path("main")
+        with open(path) as f:
+            proj.load_module("main", f, path)
+        times.append(time.perf_counter() - start)
+    return len(proj.modules), times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    log.basicConfig(level=log.WARNING)
+
+    print(f"{'modules':>8} {'best [ms]':>10} {'median [ms]':>12} {'per file [ms]':>14}")
+    for count in args.modules:
+        with tempfile.TemporaryDirectory() as tmp:
+            make_project(Path(tmp), count)
+            loaded, times = run(Path(tmp), args.repeat)
+        best, median = min(times), statistics.median(times)
+        print(f"{loaded:>8} {best * 1e3:>10.1f} {median * 1e3:>12.1f} "
+              f"{best * 1e3 / loaded:>14.3f}")
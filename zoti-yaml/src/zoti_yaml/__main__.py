@@ -7,7 +7,7 @@ import yaml
 from pathlib import Path
 
 from zoti_yaml import __version__
-from zoti_yaml import Project
+from zoti_yaml import Project, binary
 from zoti_yaml.dumper import ZotiDumper, ZotiEncoder
 from zoti_yaml.core import ATTR_MODULE, ATTR_PATH
 import zoti_yaml._main_utils as _mu
@@ -42,6 +42,11 @@ parser.add_argument(
     type=argparse.FileType('w'),
     default=sys.stdout,
 )
+parser.add_argument(
+    "--binary", action="store_true",
+    help="Dumps the output in the compact binary format, regardless\n"
+    "of extension. Implied by the '.zob' extension.",
+)
 parser.add_argument(
     "-s", "--spec", metavar="SPEC",
     help="Options to load from in 'zoticonf.toml' under [zoti-yaml.SPEC]",
@@ -54,6 +59,32 @@ parser.add_argument(
     "--argfields", metavar="KEY", type=str, nargs='+',
     help="Nodes used only for argument exchange. Default is [zoti-args]",
 )
+parser.add_argument(
+    "--cache-dir", metavar="PATH", type=str,
+    help="Caches parsed modules in PATH and reuses them in later runs\n"
+    "as long as their sources do not change.",
+)
+parser.add_argument(
+    "-j", "--jobs", metavar="N", type=int,
+    help="Parses the imported modules using N processes. Default is 1.",
+)
+parser.add_argument(
+    "--lazy-pos", action="store_true",
+    help="Records only the file and text indices in position info. The\n"
+    "line and column are computed only when shown, e.g., in errors.",
+)
+parser.add_argument(
+    "--pack-pos", action="store_true",
+    help="Refers to the file paths and tools in position info by their\n"
+    "index in a '_files' table stored in the output preamble. Implied\n"
+    "by the binary format.",
+)
+parser.add_argument(
+    "--stream", metavar="MODULE", type=str, nargs="*",
+    help="Builds each MODULE (or each module named on a line of stdin\n"
+    "if none given) reusing the loaded dependencies, and prints one\n"
+    "compact JSON record per line as soon as it is built.",
+)
 parser.add_argument(
     "main", nargs="?",
     help="""Qualified name of the main module. Ignored if module is\n"""
@@ -63,6 +94,10 @@ default_args = {
     "ext": [".yaml", ".yml"],
     "argfields": ["zoti-args"],
     "main": None,
+    "cache_dir": None,
+    "lazy_pos": False,
+    "pack_pos": False,
+    "jobs": 1,
 }
 
 args = parser.parse_args()
@@ -77,6 +112,26 @@ try:
 
     # loading inputs
     proj = Project(**conf)
+
+    # Streaming projects
+    if args.stream is not None:
+        failed = False
+        requests = args.stream or (line.strip() for line in sys.stdin)
+        for main in filter(None, requests):
+            try:
+                if main not in proj.modules:
+                    path = proj.resolve_path(main)
+                    with open(path) as f:
+                        proj.load_module(main, f, path, with_deps=True)
+                record = proj.build_copy(main).to_dump(packed=conf["pack_pos"])
+            except Exception as e:
+                log.error(f"{main}: {e}")
+                record, failed = {"module": main, "error": str(e)}, True
+            args.out.write(json.dumps(record, cls=ZotiEncoder,
+                                      separators=(",", ":")) + "\n")
+            args.out.flush()
+        sys.exit(1 if failed else 0)
+
     try:
         pream, text = _mu.read_yaml_from_stdin()
         if not all([x in pream for x in [ATTR_MODULE, ATTR_PATH]]):
@@ -97,13 +152,18 @@ try:
     # Building projects
     log.info("*** Building module ***")
     proj.build(conf["main"])
-    module = proj.modules[conf["main"]].to_dump()
 
     # Dumping project
     o_ext = Path(
         args.out.name).suffix if not "stdout" in args.out.name else ".json"
+    is_binary = args.binary or o_ext == ".zob"
+    module = proj.modules[conf["main"]].to_dump(packed=is_binary or conf["pack_pos"])
     log.info("*** Dumping module ***")
-    if o_ext in [".p", ".pickle"]:
+    if is_binary:
+        args.out.flush()
+        binary.dump(module, args.out.buffer)
+        log.info(f"  - Dumped binary at {args.out.name}")
+    elif o_ext in [".p", ".pickle"]:
         pickle.dump(module, args.out)
         log.info(f"  - Dumped pickle at {args.out.name}")
     elif o_ext in [".yaml", ".yml"]:
@@ -8,6 +8,8 @@ import toml
 import yaml
 import json
 
+from zoti_yaml import binary
+
 
 def load_config(key, args, default_args):
     keys = key.split(".")
@@ -68,6 +70,11 @@ def read_yaml_from_stdin():
 
 
 def read_json_from_stdin():
+    """Also accepts the binary format of ZOTI-YAML (see zoti_yaml.binary)."""
     assert not sys.stdin.isatty()
+    data = sys.stdin.buffer.read()
+    if binary.is_binary(data):
+        log.info("*** Reading binary source from stdin pipe ***")
+        return tuple(binary.loads(data))
     log.info("*** Reading JSON source from stdin pipe ***")
-    return tuple(json.load(sys.stdin))
+    return tuple(json.loads(data))
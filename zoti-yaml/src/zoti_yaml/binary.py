@@ -0,0 +1,111 @@
+"""Compact binary interchange format for ZOTI-YAML documents, used
+e.g., between ``zoml`` and the downstream ZOTI tools instead of
+JSON. A binary document starts with the header ``ZOB<version>``
+followed by a `MessagePack <https://msgpack.org>`_ value where
+:class:`zoti_yaml.core.Pos` and :class:`zoti_yaml.core.Ref` objects
+are stored as native extension types.
+
+Reading and writing binary documents requires the ``msgpack``
+package, installed e.g., with ``pip install zoti-yaml[binary]``.
+
+"""
+
+from typing import Any
+
+from zoti_yaml.core import Pos, Ref, TreePath
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAGIC = b"ZOB"
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+
+EXT_POS = 1
+EXT_REF = 2
+
+
+def is_binary(data: bytes) -> bool:
+    """Checks whether *data* starts like a binary document."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError("Binary documents need the 'msgpack' package, "
+                          "install it with 'pip install zoti-yaml[binary]'")
+
+
+############
+## Encode ##
+############
+
+def _ext_fields(obj):
+    if isinstance(obj, Pos):
+        return EXT_POS, obj.dump()
+    if isinstance(obj, Ref):
+        if isinstance(obj.path, TreePath):
+            return EXT_REF, [obj.module, "path", str(obj.path)]
+        return EXT_REF, [obj.module, "name", obj.path]
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _msgpack_default(obj):
+    code, fields = _ext_fields(obj)
+    return msgpack.ExtType(code, msgpack.packb(fields, use_bin_type=True))
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes *obj* (e.g., the output of
+    :meth:`zoti_yaml.handlers.Module.to_dump`) to a binary document."""
+    _require_msgpack()
+    return HEADER + msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+
+def dump(obj: Any, stream) -> None:
+    """Serializes *obj* as a binary document to a binary *stream*."""
+    stream.write(dumps(obj))
+
+
+############
+## Decode ##
+############
+
+def _from_ext(code, fields, native):
+    if code == EXT_POS:
+        return Pos(*fields) if native else fields
+    if code == EXT_REF:
+        module, kind, path = fields
+        if native:
+            return Ref(module=module, **{kind: path})
+        return {"module": module, kind: path}
+    raise ValueError(f"Unknown extension type {code} in binary document")
+
+
+def loads(data: bytes, native: bool = False) -> Any:
+    """Deserializes a binary document. If *native* is set, positions and
+    references are loaded as :class:`zoti_yaml.core.Pos` and
+    :class:`zoti_yaml.core.Ref` objects, otherwise they are loaded
+    the same way as their JSON counterparts (see
+    :class:`zoti_yaml.dumper.ZotiEncoder`).
+
+    """
+    _require_msgpack()
+    if not is_binary(data):
+        raise ValueError("Not a ZOTI binary document")
+    version = data[len(MAGIC)]
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary document version {version}")
+    body = memoryview(data)[len(HEADER):]
+
+    def _hook(code, ext):
+        return _from_ext(code, msgpack.unpackb(ext, raw=False), native)
+    return msgpack.unpackb(body, ext_hook=_hook, raw=False, strict_map_key=False)
+
+
+def load(stream, native: bool = False) -> Any:
+    """Deserializes a binary document from a binary *stream* (see
+    :func:`loads`)."""
+    return loads(stream.read(), native=native)
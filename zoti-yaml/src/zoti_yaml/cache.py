@@ -0,0 +1,155 @@
+import hashlib
+import logging as log
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from zoti_yaml.loader import TOOL
+
+Signature = Tuple[str, int, int, str]
+
+
+def signature(path) -> Signature:
+    """Returns the identity of a file on disk as a tuple (*path*,
+    *mtime*, *size*, *content hash*)."""
+    path = Path(path)
+    st = path.stat()
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    return (path.as_posix(), st.st_mtime_ns, st.st_size, digest)
+
+
+def is_fresh(sig: Signature) -> bool:
+    """Checks whether a file still matches its stored signature. The
+    content hash is computed only if the modification time changed
+    but the size did not.
+
+    """
+    path, mtime, size, digest = sig
+    try:
+        st = os.stat(path)
+        if (st.st_mtime_ns, st.st_size) == (mtime, size):
+            return True
+        if st.st_size != size:
+            return False
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest() == digest
+    except OSError:
+        return False
+
+
+class ModuleCache:
+    """On-disk cache of parsed (i.e., constructed, but not built) module
+    trees, stored as pickle files in *directory*. Each entry is keyed
+    by the absolute path of the module source and it is valid as long
+    as the source and all the files it includes (see ``!include``)
+    match their stored signature (see :func:`is_fresh`).
+
+    Entries are specific to the current version of ZOTI-YAML, to the
+    set of *key_nodes* marked with positional information and to
+    whether positions are lazy (see *lazy_pos* in
+    :class:`zoti_yaml.handlers.Project`).
+
+    """
+
+    def __init__(self, directory, key_nodes: List[str] = [], lazy_pos: bool = False):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._salt = f"{TOOL}:{sorted(key_nodes)}:{'lazy' if lazy_pos else ''}:"
+
+    def _entry(self, path) -> Path:
+        key = self._salt + Path(path).resolve().as_posix()
+        return self._dir.joinpath(hashlib.sha1(key.encode()).hexdigest() + ".pickle")
+
+    def load(self, path) -> Optional[Tuple]:
+        """Returns the cached *(preamble, doc)* pair for the module source
+        at *path*, or None if not cached or out of date."""
+        try:
+            with open(self._entry(path), "rb") as f:
+                sigs, module = pickle.load(f)
+        except Exception:
+            return None
+        if not all(is_fresh(sig) for sig in sigs):
+            log.info("  - cache entry out of date for %s", path)
+            return None
+        log.info("  ! found in cache %s", path)
+        return module
+
+    def store(self, sig: Signature, includes: List, module: Tuple) -> None:
+        """Stores the *(preamble, doc)* pair of a *module* whose source has
+        the signature *sig* (taken before parsing it), along with the
+        paths of the files it *includes*.
+
+        """
+        try:
+            sigs = [sig] + [signature(p) for p in set(includes)]
+            entry = self._entry(sig[0])
+            tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump((sigs, module), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except Exception as e:
+            log.warning(f"Could not cache module {sig[0]}: {e}")
+
+
+class DirectoryIndex:
+    """Index of the files found in each directory, listed with a single
+    scan the first time a directory is queried and reused afterwards,
+    e.g., for resolving module names to source files.
+
+    If *directory* is set, the listings are also stored there and
+    reused across runs for as long as the modification time of their
+    directory does not change.
+
+    """
+
+    # listings of directories modified more recently than this (in
+    # ns) are not stored, since later changes might keep their mtime
+    RACY = 2_000_000_000
+
+    def __init__(self, directory=None):
+        self._store = Path(directory, "directories.index") if directory else None
+        self._stored: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+        self._listings: Dict[str, FrozenSet[str]] = {}
+        self._dirty = False
+        if self._store:
+            try:
+                with open(self._store, "rb") as f:
+                    self._stored = pickle.load(f)
+            except Exception:
+                self._stored = {}
+
+    def files(self, path) -> FrozenSet[str]:
+        """Returns the names of the files in directory *path*."""
+        key = Path(path).as_posix()
+        listing = self._listings.get(key)
+        if listing is not None:
+            return listing
+        try:
+            mtime = os.stat(key).st_mtime_ns
+            stored = self._stored.get(key)
+            if stored and stored[0] == mtime:
+                listing = stored[1]
+            else:
+                with os.scandir(key) as entries:
+                    listing = frozenset(e.name for e in entries if e.is_file())
+                if self._store and time.time_ns() - mtime > self.RACY:
+                    self._stored[key] = (mtime, listing)
+                    self._dirty = True
+        except OSError:
+            listing = frozenset()
+        self._listings[key] = listing
+        return listing
+
+    def save(self) -> None:
+        """Stores the listings scanned so far, if a *directory* was given."""
+        if not (self._store and self._dirty):
+            return
+        try:
+            tmp = self._store.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(self._stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._store)
+            self._dirty = False
+        except Exception as e:
+            log.warning(f"Could not store directory index {self._store}: {e}")
@@ -1,15 +1,20 @@
 import logging as log
-from copy import deepcopy
+import sys
+from bisect import bisect_right
+from copy import copy
+from functools import lru_cache
 from pathlib import Path, PurePosixPath
 from pprint import pformat, pprint
 from typing import Any, Dict, List, Optional, Union, Generic, TypeVar
 from dataclasses import dataclass
+from importlib.metadata import distribution
 
 import yaml
 
 INFO = "_info"
 POS = "_pos"
-RESERVED_KWS = [INFO, POS]
+FILES = "_files"
+RESERVED_KWS = [INFO, POS, FILES]
 
 ATTR_NAME = "name"
 ATTR_PATH = "path"
@@ -22,6 +27,9 @@ POLICY_RUNION = "union+replace"
 POLICY_INTER = "intersect"
 POLICY_RINTER = "replace+intersect"
 
+DIST = distribution("zoti_yaml")
+TOOL = DIST.name + "-" + DIST.version
+
 
 def clean(node):
     if isinstance(node, list):
@@ -44,13 +52,15 @@ def clean(node):
 
 class Pos:
     """Container for positional information in a YAML file. Depends on
-    the info from a PyYAML loader."""
+    the info from a PyYAML loader.
+
+    If *line* and *column* are not given (e.g., for lazy positions,
+    see :meth:`from_entry`) they are computed from *ibegin* only when
+    needed, by reading the source file at *path*.
 
-    line: int
-    """line number"""
+    """
 
-    column: int
-    """column number"""
+    __slots__ = ("_line", "_column", "ibegin", "iend", "path", "who")
 
     ibegin: int
     """start index in the text file"""
@@ -65,13 +75,35 @@ class Pos:
     """string for bookkeeping the processing pipeline for this node"""
 
     def __init__(self, line, column, ibegin=0, iend=-1, path=None, who=None):
-        self.line = line
-        self.column = column
+        self._line = line
+        self._column = column
         self.ibegin = ibegin
         self.iend = iend
         self.path = path
         self.who = who
 
+    @property
+    def line(self) -> int:
+        """line number (-1 if it cannot be found)"""
+        if self._line is None:
+            self._locate()
+        return self._line
+
+    @property
+    def column(self) -> int:
+        """column number (-1 if it cannot be found)"""
+        if self._column is None:
+            self._locate()
+        return self._column
+
+    def _locate(self):
+        try:
+            starts = _line_starts(self.path)
+            line = bisect_right(starts, self.ibegin) - 1
+            self._line, self._column = line, self.ibegin - starts[line]
+        except Exception:
+            self._line, self._column = -1, -1
+
     @classmethod
     def from_mark(cls, start_mark: yaml.Mark, end_mark: yaml.Mark,
                   path: str = "<stdio>", who: Optional[str] = None):
@@ -84,8 +116,24 @@ class Pos:
             who,
         )
 
+    @classmethod
+    def from_entry(cls, entry: List, files: Optional["FileTable"] = None):
+        """Recreates a position from an entry in a document, i.e., either
+        as dumped by :meth:`dump` or a compact ``[file, ibegin, iend]``
+        entry recorded by a loader with lazy positions (see
+        :class:`zoti_yaml.loader.ZomlLoader`), where *file* is the index
+        of the source path in *files*.
+
+        """
+        if len(entry) == 3:
+            fid, ibegin, iend = entry
+            return cls(None, None, ibegin, iend, files[fid], TOOL)
+        return cls(*entry)
+
     def __repr__(self):
         rep = f'in "{self.path}", '
+        if self.line < 0:
+            return rep + f"index {self.ibegin}"
         rep += f"line {self.line+1}, column {self.column+1}"
         return rep
 
@@ -93,14 +141,14 @@ class Pos:
         """Dump content to a JSON list of arguments that can be used to
         recreate it.
         """
-        return [self.line, self.column, self.ibegin, self.iend, self.path, self.who]
+        return [self._line, self._column, self.ibegin, self.iend, self.path, self.who]
 
     def show(self) -> str:
         """Pretty print content. Checks `logging.root.level`."""
         rep = repr(self)
         if log.root.level > log.WARN:  # silent
             return rep
-        if Path(self.path).is_file():
+        if self.line >= 0 and isinstance(self.path, str) and Path(self.path).is_file():
             try:
                 with open(self.path) as f:
                     if log.root.level < log.WARN:  # verbose
@@ -115,6 +163,148 @@ class Pos:
         return rep
 
 
+@lru_cache(maxsize=16)
+def _line_starts(path: str) -> List[int]:
+    with open(path) as f:
+        text = f.read()
+    starts = [0]
+    idx = text.find("\n")
+    while idx >= 0:
+        starts.append(idx + 1)
+        idx = text.find("\n", idx + 1)
+    return starts
+
+
+class FileTable:
+    """Table of the strings referred to by positional information, i.e.,
+    source file paths and tool names. Each string is stored only once
+    and can be referred to by its index in the table, e.g., in dumped
+    documents (see :func:`pack_pos`).
+
+    """
+
+    def __init__(self, entries: List[str] = []):
+        self._entries: List[str] = []
+        self._index: Dict[str, int] = {}
+        for entry in entries:
+            self.index(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, idx: int) -> str:
+        return self._entries[idx]
+
+    def index(self, entry: str) -> int:
+        """Returns the index of *entry*, adding it to the table if needed."""
+        idx = self._index.get(entry)
+        if idx is None:
+            idx = self._index[entry] = len(self._entries)
+            self._entries.append(entry)
+        return idx
+
+    def intern(self, entry: Optional[str]) -> Optional[str]:
+        """Returns the instance of *entry* stored in the table."""
+        return entry if entry is None else self._entries[self.index(entry)]
+
+    def dump(self) -> List[str]:
+        """Dump content to a JSON list of entries."""
+        return list(self._entries)
+
+
+def pack_pos(node, table: Optional[FileTable] = None,
+             files: Optional[FileTable] = None):
+    """Returns a copy of the JSON tree *node* where all positional
+    information entries are full ones, i.e., compact entries, whose
+    file is an index in *files* (see :meth:`Pos.from_entry`), are
+    expanded, also under ``!default`` and ``!policy`` nodes. If
+    *table* is given, the file path and tool of each entry are
+    moreover replaced by their index in it. Other objects are not
+    copied.
+
+    """
+    if isinstance(node, list):
+        return [pack_pos(n, table, files) for n in node]
+    if isinstance(node, Default):
+        node = copy(node)
+        node.defaults = pack_pos(node.defaults, table, files)
+        node.original = pack_pos(node.original, table, files)
+        return node
+    if isinstance(node, MergePolicy):
+        return MergePolicy(pack_pos(node.obj, table, files), node.union, node.replace)
+    if not isinstance(node, dict):
+        return node
+    ret = {k: pack_pos(v, table, files) for k, v in node.items()}
+    info = node.get(INFO)
+    if isinstance(info, dict) and isinstance(info.get(POS), list):
+        def _index(f):
+            if table is None or f is None or isinstance(f, int):
+                return f
+            return table.index(f)
+
+        ret[INFO][POS] = [
+            [None, None, p[1], p[2], _index(files[p[0]]), _index(TOOL)]
+            if len(p) == 3 else
+            list(p[:4]) + [_index(f) for f in p[4:6]] + list(p[6:])
+            for p in info[POS]
+        ]
+    return ret
+
+
+def _each_pos(node, f) -> None:
+    """Calls *f* on each positional information entry in the JSON tree
+    *node*, also under ``!default`` and ``!policy`` nodes."""
+    if isinstance(node, list):
+        for n in node:
+            _each_pos(n, f)
+    elif isinstance(node, Default):
+        _each_pos(node.defaults, f)
+        _each_pos(node.original, f)
+    elif isinstance(node, MergePolicy):
+        _each_pos(node.obj, f)
+    elif isinstance(node, dict):
+        for key, val in node.items():
+            if key == INFO and isinstance(val, dict) and isinstance(val.get(POS), list):
+                for p in val[POS]:
+                    if isinstance(p, list):
+                        f(p)
+            _each_pos(val, f)
+
+
+def unpack_pos(node, table: Union[FileTable, List[str]]) -> None:
+    """Inverse of :func:`pack_pos`, replaces in place all indices in the
+    positional information entries of *node* with the entries of
+    *table*.
+
+    """
+    def _unpack(p):
+        for i in range(4, min(len(p), 6)):
+            if isinstance(p[i], int):
+                p[i] = table[p[i]]
+
+    _each_pos(node, _unpack)
+
+
+def move_pos(node, source: FileTable, table: FileTable) -> None:
+    """Merges the *source* file table into *table* and moves in place
+    the positional information entries of *node* to it, i.e., interns
+    their strings in *table* and renumbers compact entries (see
+    :meth:`Pos.from_entry`) after it.
+
+    """
+    ids = [table.index(entry) for entry in source.dump()]
+
+    def _move(p):
+        if len(p) == 3:
+            p[0] = ids[p[0]]
+            return
+        for i in range(4, min(len(p), 6)):
+            if isinstance(p[i], str):
+                p[i] = table.intern(p[i])
+
+    _each_pos(node, _move)
+
+
 class PosStack:
     """A stack containing the history of attached positional informations."""
     _stack: List[Pos]
@@ -159,23 +349,27 @@ def attach_pos(node: Dict, pos: Pos, to_head=False) -> None:
 #             return Pos(*getattr(node, INFO)[POS][0])
 #     except Exception:
 #         return None
-def get_pos(node: Dict) -> Optional[PosStack]:
-    """Helper function to retrieve position information from a JSON node, if any."""
+def get_pos(node: Dict, files: Optional[FileTable] = None) -> Optional[PosStack]:
+    """Helper function to retrieve position information from a JSON
+    node, if any. Compact entries refer to their file in *files* (see
+    :meth:`Pos.from_entry`).
+
+    """
     try:
         if isinstance(node, dict):
-            return PosStack([Pos(*p) for p in node[INFO][POS]])
+            return PosStack([Pos.from_entry(p, files) for p in node[INFO][POS]])
         else:
-            return PosStack([Pos(*p) for p in getattr(node, INFO)[POS]])
+            return PosStack([Pos.from_entry(p, files) for p in getattr(node, INFO)[POS]])
     except Exception:
         return None
 
 
-def get_all_pos(node: Dict) -> Optional[List[Pos]]:
+def get_all_pos(node: Dict, files: Optional[FileTable] = None) -> Optional[List[Pos]]:
     try:
         if isinstance(node, dict):
-            return [Pos(*p) for p in node[INFO][POS]]
+            return [Pos.from_entry(p, files) for p in node[INFO][POS]]
         else:
-            return [Pos(*p) for p in getattr(node, INFO)[POS]]
+            return [Pos.from_entry(p, files) for p in getattr(node, INFO)[POS]]
     except Exception:
         return None
 
@@ -412,18 +606,24 @@ class Attach:
         self.ref = ref
         self.pos = pos
         self.concat = concat
-        self.pos.who = f"{pos.who}:!attach"
+        self.pos.who = sys.intern(f"{pos.who}:!attach")
         self.extra = kwargs
 
     def __repr__(self):
         return "!attach " + repr({"ref": self.ref, **self.extra})
 
     def resolve(self, modules):
-        """OBS: Does not add new entries to the attached node!"""
+        """OBS: Does not add new entries to the attached node!
+
+        The referenced node is not copied: only its top-level container
+        (and its ``_info`` entry) is new, whereas its children are
+        shared with the source tree. Callers need to copy a child
+        before changing it (see :meth:`zoti_yaml.handlers.Project.build`).
+
+        """
         if self.ref.module not in modules:
             raise KeyError(f"Module '{self.ref.module}' not loaded.")
-        refnode = deepcopy(modules[self.ref.module].get(
-            self.ref.path, strict=False))
+        refnode = modules[self.ref.module].get(self.ref.path, strict=False)
         if isinstance(refnode, list):
             log.info("  - attached node: %s", repr(self.ref))
             return refnode + self.concat
@@ -432,6 +632,11 @@ class Attach:
             return refnode
 
         # update metadata of the retreived node
+        refnode = dict(refnode)
+        if INFO in refnode:
+            refnode[INFO] = dict(refnode[INFO])
+            if POS in refnode[INFO]:
+                refnode[INFO][POS] = list(refnode[INFO][POS])
         attach_pos(refnode, self.pos)
         refnode[INFO]["_prev_attrs"] = {}
         # _merge_dict(refnode, node, replace=True)
@@ -562,6 +767,11 @@ class Default:
         return "!default\n" + pformat([self.defaults, self.original])
 
     def resolve(self):
+        """Returns *original* merged with *defaults*. Neither of them is
+        changed: merged containers are copied, whereas values taken
+        from *defaults* are shared by all nodes they are merged in.
+
+        """
         def _merge_dict(orig: Dict, default: Dict, policy: MergePolicy) -> Any:
             def _merge_val(key, val):
                 if isinstance(val, MergePolicy):
@@ -574,7 +784,7 @@ class Default:
                 if key in orig:
                     orig[key] = _merge_dict(orig[key], val, new_policy)
                 elif new_policy.union:
-                    orig[key] = deepcopy(val)
+                    orig[key] = val
                 return
 
             if type(orig) != type(default):
@@ -584,6 +794,7 @@ class Default:
                 msg += f"\n  {pformat(orig)}"
                 raise ValueError(msg)
             if isinstance(orig, dict):
+                orig = dict(orig)
                 for key, val in default.items():
                     _merge_val(key, val)
             elif isinstance(orig, list):
@@ -593,10 +804,10 @@ class Default:
                 orig = [_merge_dict(element, default[0], policy)
                         for element in orig]
             elif policy.replace or not orig:
-                orig = deepcopy(default)
+                orig = default
             return orig
 
-        _merge_dict(self.original, clean(self.defaults), policy=MergePolicy())
+        merged = _merge_dict(self.original, clean(self.defaults), policy=MergePolicy())
         log.info("  - default values applied")
 
-        return self.original
+        return merged
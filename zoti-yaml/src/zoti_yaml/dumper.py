@@ -6,6 +6,10 @@ from zoti_yaml.core import Pos, Ref, TreePath
 
 
 class ZotiDumper(Dumper):
+    def ignore_aliases(self, data):
+        # built documents may share subtrees, which are dumped in full
+        return True
+
     def repr_pos(self, pos):
         rep = [
             pos.start_line,
@@ -1,14 +1,19 @@
 import logging as log
 from datetime import datetime
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from copy import copy, deepcopy
 from pathlib import Path, PurePosixPath
 from pprint import pformat
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 import marshmallow as mm
 
+import zoti_yaml.binary as binary
 import zoti_yaml.core as ty
-from zoti_yaml.exceptions import MarkedError, SearchError
-from zoti_yaml.loader import ZomlLoader, load
+from zoti_yaml.cache import DirectoryIndex, ModuleCache, signature
+from zoti_yaml.exceptions import MarkedError, ModuleError, SearchError
+from zoti_yaml.loader import IncludeCache, ZomlLoader, load
 
 
 class PreambleSchema(mm.Schema):
@@ -29,25 +34,38 @@ class Module:
     utilities used for convenient data access and manipulation.
 
     The basic constructor requires the (possibly pre-stored)
-    *preamble* and *doc* trees (see :meth:`to_dump`).
+    *preamble* and *doc* trees (see :meth:`to_dump`). Positional
+    information referring to the file table stored in the preamble is
+    expanded, interning its entries in *files* if given. The same
+    table resolves the compact entries of lazily loaded positions.
 
     """
     name: str
     path: Path
     preamble: Dict
     doc: Dict
+    files: ty.FileTable
 
-    def __init__(self, preamble={}, doc={}):
+    def __init__(self, preamble={}, doc={}, files: Optional[ty.FileTable] = None):
         err = PreambleSchema().validate(preamble)
         if err:
             raise ImportError(pformat(err))
+        self.files = files if files is not None else ty.FileTable()
+        if ty.FILES in preamble:
+            stored = preamble.pop(ty.FILES)
+            ty.unpack_pos(doc, [self.files.intern(f) for f in stored])
         self.name = preamble[ty.ATTR_MODULE]
         self.path = preamble.get(ty.ATTR_PATH, ".")
         self.preamble = preamble
         self.doc = doc
+        self._names = {}
 
     @classmethod
-    def from_zoml(cls, stream, filepath: str, key_nodes: List = []):
+    def from_zoml(cls, stream, filepath: str, key_nodes: List = [],
+                  includes: Optional[List] = None,
+                  files: Optional[ty.FileTable] = None,
+                  lazy_pos: bool = False,
+                  texts: Optional[IncludeCache] = None):
         """:class:`Module` constructor which incoprorates both file loader and
         parser.
 
@@ -62,9 +80,23 @@ class Module:
         :param key_nodes: nodes whose children will be marked with
           positional info.
 
+        :param includes: if a list is passed, the paths of all files
+          pulled in with ``!include`` are appended to it.
+
+        :param files: table where the strings in positional info are
+          interned, e.g., shared by all modules in a project.
+
+        :param lazy_pos: if set, the line and column in positional info
+          are computed only when shown (see :class:`zoti_yaml.loader.LoaderWithInfo`).
+
+        :param texts: cache of the files pulled in with ``!include``,
+          e.g., shared by all modules in a project.
+
         """
-        # print(key_nodes)
-        docs = list(load(stream, path=filepath, Loader=ZomlLoader, key_nodes=key_nodes))
+        files = files if files is not None else ty.FileTable()
+        docs = list(load(stream, path=filepath, Loader=ZomlLoader,
+                         key_nodes=key_nodes, includes=includes, files=files,
+                         lazy_pos=lazy_pos, texts=texts))
         # print(docs)
         if len(docs) != 2:
             msg = f"File '{filepath}' is not a ZOTI-YAML module."
@@ -80,7 +112,15 @@ class Module:
         # if "tool-log" not in preamble:
         #     preamble["tool-log"] = []
         # preamble["tool-log"].append([str(datetime.now()), tool])
-        return cls(preamble, content)
+        return cls(preamble, content, files)
+
+    @classmethod
+    def from_binary(cls, stream):
+        """:class:`Module` constructor from a binary *stream* in the
+        format of :mod:`zoti_yaml.binary`, e.g., as dumped by ``zoml``.
+
+        """
+        return cls(*binary.load(stream, native=True))
 
     def map_doc(self, f, with_path=False, **kwargs):
         """Functor on a Module document. Maps function *f(n)* on each node *n*
@@ -110,6 +150,7 @@ class Module:
             elif isinstance(node, ty.Attach):
                 node.ref = _map(f, node.ref, path)
             elif isinstance(node, ty.Default):
+                node = copy(node)
                 node.original = {
                     k: _map(f, v, path.with_key(k) if path else None)
                     for k, v in node.original.items()
@@ -123,6 +164,103 @@ class Module:
             self.doc = _map(f, self.doc, root)
         else:
             self.doc = _map(f, self.doc)
+        self._names = {}
+
+    def walk(self, *visitors, is_shared=None):
+        """Fused, in-place counterpart of :meth:`map_doc`. Visits each node
+        *n* in the document tree once, children first, and applies on it
+        each of the *visitors* in turn, i.e., functions *f(n)* returning
+        the node replacing *n* (or *n* itself). Containers are updated in
+        place with the replaced children, except for those shared with
+        other trees, as told by *is_shared(n, parent_is_shared)*, which
+        are copied on write. Positional info (``_pos``) is not visited.
+
+        """
+        done = {}
+
+        def _walk(node, parent_shared):
+            if id(node) in done:
+                return done[id(node)][1]
+            orig = node
+            node_shared = bool(is_shared and is_shared(node, parent_shared))
+            # an aliased container is visited once, even if it (wrongly)
+            # contains itself
+            done[id(orig)] = (orig, orig)
+            if isinstance(node, (dict, list, ty.Default)):
+                items = node.original if isinstance(node, ty.Default) else node
+                keys = ([k for k in items if k != ty.POS] if isinstance(items, dict)
+                        else range(len(items)))
+                for k in keys:
+                    child = items[k]
+                    new = _walk(child, node_shared)
+                    if new is child:
+                        continue
+                    if node_shared and node is orig:
+                        node = copy(node)
+                        if isinstance(node, ty.Default):
+                            node.original = dict(node.original)
+                        items = node.original if isinstance(node, ty.Default) else node
+                    items[k] = new
+            elif isinstance(node, ty.Attach):
+                ref = _walk(node.ref, node_shared)
+                if ref is not node.ref:
+                    node = copy(node) if node_shared else node
+                    node.ref = ref
+            elif isinstance(node, ty.MergePolicy):
+                raise ValueError("!policy:... construct outside !default")
+            for f in visitors:
+                node = f(node)
+            done[id(orig)] = (orig, node)
+            return node
+
+        self.doc = _walk(self.doc, False)
+        self._names = {}
+
+    def use_files(self, files: ty.FileTable) -> None:
+        """Moves the positional information of the document to the file
+        table *files*, e.g., the one of a project loading a module
+        parsed elsewhere (see :func:`zoti_yaml.core.move_pos`).
+
+        """
+        if files is not self.files:
+            ty.move_pos(self.doc, self.files, files)
+            self.files = files
+
+    def _index_of(self, lst: List, name) -> Optional[int]:
+        """Returns the position of the first element in *lst* with field
+        ``name: <name>``. The positions are indexed lazily for each
+        list in the document. An index entry is checked on every use,
+        and rebuilt if the list was changed in the meantime.
+
+        """
+        entry = self._names.get(id(lst))
+        if entry is not None and entry[0] is lst:
+            idx = entry[1].get(name)
+            if (idx is not None and idx < len(lst)
+                    and isinstance(lst[idx], dict)
+                    and lst[idx].get(ty.ATTR_NAME) == name):
+                return idx
+        index = {}
+        for idx, el in enumerate(lst):
+            try:
+                if isinstance(el, dict) and ty.ATTR_NAME in el:
+                    index.setdefault(el[ty.ATTR_NAME], idx)
+            except TypeError:  # unhashable name
+                pass
+        self._names[id(lst)] = (lst, index)
+        return index.get(name)
+
+    def _position(self, lst, nm_idx) -> Optional[int]:
+        """Returns the position of the element in *lst* given by *nm_idx*,
+        which is either an index or a name (see :meth:`get`)."""
+        try:
+            idx = int(nm_idx)
+            lst[idx]
+            return idx
+        except ValueError:
+            return self._index_of(lst, nm_idx) if isinstance(lst, list) else None
+        except Exception:
+            return None
 
     def get(self, ref_path: Union[ty.TreePath, PurePosixPath, str], strict=True):
         """Returns an arbitrary node in the document tree vased on its path
@@ -144,21 +282,14 @@ class Module:
 
         """
         def _get_element_with_name(nm_idx, lst, path, prev_path, key):
-            try:
-                try:
-                    element = lst[int(nm_idx)]
-                except ValueError:
-                    filt = [el for el in lst
-                            if isinstance(el, dict)
-                            and el.get(ty.ATTR_NAME) == nm_idx]
-                    element = filt[0]
-            except Exception:
+            idx = self._position(lst, nm_idx)
+            if idx is None:
                 if not strict:
                     return None
                 else:
                     msg = f"Cannot find element with index {nm_idx}"
                     raise SearchError(msg, "/".join(prev_path))
-            return _recursive_node_getter(element, path, prev_path)
+            return _recursive_node_getter(lst[idx], path, prev_path)
 
         def _recursive_node_getter(obj, path: List, prev_path: List = []):
             if isinstance(obj, ty.Default):
@@ -182,7 +313,7 @@ class Module:
                 if not strict:
                     return None
                 else:
-                    raise MarkedError(e, ty.get_pos(obj))
+                    raise MarkedError(e, ty.get_pos(obj, self.files))
 
         path = (
             ref_path if isinstance(ref_path, PurePosixPath)
@@ -192,10 +323,284 @@ class Module:
         parts = list(path.parts) if path.root == "" else list(path.parts)[1:]
         return _recursive_node_getter(self.doc, parts)
 
-    def to_dump(self):
-        """Returns the *preamble* and *doc* as a list suitable for storing."""
-        return [self.preamble, self.doc]
+    def to_dump(self, packed: bool = False):
+        """Returns the *preamble* and *doc* as a list suitable for
+        storing. The positional information in the dumped *doc*
+        contains the file paths and tools as strings, unless *packed*
+        is set, in which case it refers to them by their index in a
+        table stored under ``_files`` in the dumped *preamble* (see
+        :func:`zoti_yaml.core.pack_pos`).
 
+        """
+        if not packed:
+            return [self.preamble, ty.pack_pos(self.doc, files=self.files)]
+        table = ty.FileTable()
+        doc = ty.pack_pos(self.doc, table, self.files)
+        return [{**self.preamble, ty.FILES: table.dump()}, doc]
+
+
+def _try(f, *args):
+    try:
+        return f(*args)
+    except Exception as e:
+        return e
+
+
+def _parse_module(source, path, key_nodes, lazy_pos=False, cache=None,
+                  files=None, texts=None) -> Module:
+    # only files on disk are cached, not, e.g., piped text
+    if not (cache and Path(getattr(source, "name", "")) == Path(path)):
+        return Module.from_zoml(source, path, key_nodes,
+                                files=files, lazy_pos=lazy_pos, texts=texts)
+    cached = cache.load(path)
+    if cached is not None:
+        preamble, doc = cached
+        preamble[ty.ATTR_PATH] = path
+        return Module(preamble, doc, files)
+    sig, includes = signature(path), []
+    module = Module.from_zoml(source, path, key_nodes, includes, files, lazy_pos,
+                              texts)
+    cache.store(sig, includes, module.to_dump(packed=True))
+    return module
+
+
+# also called in worker processes, thus its arguments and result are
+# pickled
+def _parse_file(path, key_nodes, lazy_pos=False, cache=None, files=None,
+                texts=None) -> Module:
+    with open(path) as f:
+        return _parse_module(f, path, key_nodes, lazy_pos, cache, files, texts)
+
+
+class _Resolver:
+    """Stitches the nodes referenced with ``!attach`` in the document of
+    *module* (named *name* in *modules*) and resolves its ``!ref``
+    nodes, in place (see :meth:`Project.build`). Besides the queue of
+    subtrees to visit, it keeps track of the containers resolved so
+    far, of those created or shared during the build, and of the
+    chains of ``!attach`` links being followed, for detecting cycles.
+
+    """
+
+    def __init__(self, name: str, module: Module, modules: Dict[str, Module]):
+        self._name = name
+        self._module = module
+        self._modules = modules
+        self._root = [module.doc]  # holder for the document root
+        self._worklist = deque([(module.doc, self._root, 0, None, ())])
+        self._visited = {}  # containers resolved or being resolved, with path and trail
+        self._owned = {}  # nodes created during this build
+        self._shared = {}  # nodes shared with other trees
+        self._trails = {}  # chain of !attach links which created a subtree
+        self._active = {}  # !attach nodes being resolved, with their links and paths
+
+    def run(self) -> None:
+        """Resolves the queued subtrees, starting with the document
+        root, until none is left."""
+        while self._worklist:
+            node, parent, key, ppath, trail = self._worklist.popleft()
+            new = self._resolve(node, parent, key, ppath, trail, False)
+            if parent is self._root:
+                self._settle(self._root, 0, new)
+
+    def is_shared(self, node, parent_shared) -> bool:
+        """Tells if *node* is shared with other trees, e.g., with the
+        source of an attached subtree, thus needs to be copied before
+        being changed (see :meth:`Module.walk`)."""
+        return id(node) not in self._owned and (parent_shared or id(node) in self._shared)
+
+    def _error(self, node, e):
+        if isinstance(e, ModuleError):
+            return e
+        pos = getattr(node, "pos", None)
+        msg = (pos.show() + "\n" if pos else "") + str(e)
+        return ModuleError(msg, module=self._name, path=self._module.path)
+
+    # path of a node stored at parent[key], given the path of parent
+    def _path(self, node, parent, key, ppath):
+        if parent is self._root:
+            return ty.TreePath("/")
+        if isinstance(parent, list):
+            name = (node[ty.ATTR_NAME]
+                    if isinstance(node, dict) and ty.ATTR_NAME in node
+                    else key)
+            return ppath.with_name(name)
+        return ppath.with_key(key)
+
+    # tells if *path* is *top* or a path below it
+    @staticmethod
+    def _within(path, top):
+        parts, tparts = path.path.parts, top.path.parts
+        if len(parts) < len(tparts) or parts[:len(tparts) - 1] != tparts[:-1]:
+            return False
+        part = parts[len(tparts) - 1]
+        return part == tparts[-1] or part.startswith(tparts[-1] + "[")
+
+    # positional info never contains references, thus it is skipped
+    @staticmethod
+    def _items(node):
+        node = node.original if isinstance(node, ty.Default) else node
+        if isinstance(node, dict):
+            return node, [k for k in node if k != ty.POS]
+        return node, range(len(node))
+
+    @staticmethod
+    def _cycle(links):
+        msg = " -> ".join(links)
+        raise ValueError(f"Cycle detected in !attach chain: {msg}")
+
+    def _own(self, node):
+        self._owned[id(node)] = node
+        if isinstance(node, ty.Default):
+            node = node.original
+            self._owned[id(node)] = node
+        if isinstance(node, (dict, list)):
+            for child in (node.values() if isinstance(node, dict) else node):
+                if id(child) not in self._owned:
+                    self._shared[id(child)] = child
+        return node
+
+    def _copy(self, node):
+        if isinstance(node, ty.Default):
+            node = copy(node)
+            node.original = dict(node.original)
+        else:
+            node = copy(node)
+        self._own(node)
+        return node
+
+    def _settle(self, parent, key, node):
+        if parent[key] is not node:
+            parent[key] = node
+            if parent is self._root:
+                self._module.doc = node
+
+    # finds the slot of a node in this module, the same way as
+    # Module.get, resolving "!attach" nodes and copying shared
+    # containers on the way to it
+    def _locate(self, tpath):
+        parent, key, ppath, trail = self._root, 0, None, ()
+        parts = tpath.path.parts
+        for part in parts[1:] if tpath.path.root else parts:
+            node = parent[key]
+            if isinstance(node, ty.Attach):
+                node = self._resolve(node, parent, key, ppath, trail, False)
+                self._settle(parent, key, node)
+            if self.is_shared(node, False):
+                node = self._copy(node)
+                self._settle(parent, key, node)
+            path = self._path(node, parent, key, ppath)
+            trail = self._trails.get(id(node), (None, trail))[1]
+            if isinstance(node, ty.Default):
+                node = node.original
+            k, elpath = tuple((part.split("[", 1) + [""])[:2])
+            if not isinstance(node, dict) or k not in node:
+                return None
+            parent, key, ppath = node, k, path
+            if elpath:
+                lst, nm_idx = node[k], elpath.rstrip("]")
+                if not isinstance(lst, list):
+                    return None
+                if self.is_shared(lst, False):
+                    lst = self._copy(lst)
+                    self._settle(node, k, lst)
+                idx = self._module._position(lst, nm_idx)
+                if idx is None:
+                    return None
+                parent, key, ppath = lst, idx, self._path(lst, node, k, path)
+        node = parent[key]
+        trail = self._trails.get(id(node), (None, trail))[1]
+        return node, parent, key, ppath, trail, self.is_shared(node, False)
+
+    def _attach(self, node, path, trail, is_shared):
+        orig = node
+        if is_shared:
+            node = copy(node)
+            node.ref = deepcopy(node.ref)
+        node.ref.resolve(this=self._name, root=path)
+        link = repr(node.ref)
+        if (id(orig), link) in self._active:
+            links = [lnk for lnk, _ in self._active.values()]
+            self._cycle(links[links.index(link):] + [link])
+        if link in trail:
+            self._cycle(list(trail[trail.index(link):]) + [link])
+        if node.ref.module == self._name:
+            self._active[(id(orig), link)] = (link, path)
+            target = self._locate(node.ref.path)
+            if target is not None:
+                # the target must not contain this !attach node, nor
+                # any other one waiting for it to be resolved, be it
+                # in place or under an attached (e.g., imported) tree
+                top = self._path(*target[:4])
+                pending = list(self._active.values())
+                for idx, (_, apath) in enumerate(pending):
+                    if self._within(apath, top):
+                        self._cycle([lnk for lnk, _ in pending[idx:]] + [link])
+                # only chained "!attach" nodes are resolved, the
+                # rest of the target is copied as is, thus its
+                # references are resolved at the attach site
+                if isinstance(target[0], ty.Attach):
+                    self._settle(target[1], target[2], self._resolve(*target))
+            del self._active[(id(orig), link)]
+        return node.resolve(self._modules), trail + (link,)
+
+    # stitches nodes referenced with "!attach" and resolves "!ref"s.
+    # Returns the resolved node, which is a copy if *node* is shared.
+    def _resolve(self, node, parent, key, ppath, trail, is_shared):
+        is_shared = self.is_shared(node, is_shared)
+        path = self._path(node, parent, key, ppath)
+        if isinstance(node, (dict, list, ty.Default)):
+            if id(node) in self._visited:
+                # a container reached below itself through the
+                # subtrees attached meanwhile, e.g., from a module
+                # which attaches it back
+                _, home, htrail = self._visited[id(node)]
+                if path.path != home.path and self._within(path, home):
+                    links = list(trail[len(htrail):]) or list(trail[-1:])
+                    try:
+                        self._cycle(links + links[:1])
+                    except ValueError as e:
+                        raise self._error(node, e)
+                return node
+            if not is_shared:
+                self._visited[id(node)] = (node, path, trail)
+            items, keys = self._items(node)
+            changes = {}
+            for k in keys:
+                child = items[k]
+                new = self._resolve(child, items, k, path, trail, is_shared)
+                if new is not child and is_shared:
+                    changes[k] = new
+                elif new is not child:
+                    items[k] = new
+            if is_shared and changes:
+                node = self._copy(node)
+                items, _ = self._items(node)
+                for k, new in changes.items():
+                    items[k] = new
+            self._visited[id(node)] = (node, path, trail)
+        elif isinstance(node, ty.MergePolicy):
+            raise ValueError("!policy:... construct outside !default")
+        elif isinstance(node, ty.Ref):
+            try:
+                if is_shared and not (node.module and node.path.is_resolved
+                                      if isinstance(node.path, ty.TreePath)
+                                      else node.module):
+                    node = deepcopy(node)
+                node.resolve(this=self._name, root=path)
+            except Exception as e:
+                raise self._error(node, e)
+        elif isinstance(node, ty.Attach):
+            try:
+                node, trail = self._attach(node, path, trail, is_shared)
+            except Exception as e:
+                raise self._error(node, e)
+            if not isinstance(node, (dict, list)):
+                return self._resolve(node, parent, key, ppath, trail, True)
+            self._own(node)
+            self._trails[id(node)] = (node, trail)
+            self._worklist.append((node, parent, key, ppath, trail))
+        return node
 
 
 class Project:
@@ -218,17 +623,39 @@ class Project:
       e.g., argument exchange. These fields will be deleted from the
       output result.
 
+    :param cache_dir: if set, parsed modules are cached in this folder
+      and reused in later runs as long as their source files do not
+      change (see :class:`zoti_yaml.cache.ModuleCache`), along with
+      the listings of the searched folders (see
+      :class:`zoti_yaml.cache.DirectoryIndex`).
+
+    :param lazy_pos: if set, positional metadata records only the file
+      and the text indices of each node, while its line and column are
+      computed only if shown, e.g., in an error message.
+
+    :param jobs: number of processes used to parse module dependencies
+      concurrently (see :meth:`load_module`). If 1, they are all parsed
+      in the current process. The positional info of modules parsed in
+      other processes is moved to :attr:`files`, whereas the files
+      they pull in with ``!include`` are cached per process.
+
     """
 
     modules: Dict[str, Module]
     """dictionary of loaded modules indexed by their name"""
 
+    files: ty.FileTable
+    """table of strings shared by the positional info of all modules"""
+
     def __init__(
             self,
             keys: List[str] = [],
             pathvar: List[str] = [],
             ext: List[str] = [".yaml", ".yml"],
             argfields: List[str] = ["zoti-args"],
+            cache_dir: Optional[str] = None,
+            lazy_pos: bool = False,
+            jobs: int = 1,
             **kwargs
     ):
         path_var = "" if pathvar is None else pathvar
@@ -238,30 +665,44 @@ class Project:
         self._key_nodes = keys
         self._exts = ext
         self._argfields = argfields
+        self._lazy_pos = lazy_pos
+        self._jobs = jobs or 1
+        self._cache = ModuleCache(cache_dir, keys, lazy_pos) if cache_dir else None
+        self._dirs = DirectoryIndex(cache_dir)
         self.modules = {}
+        self.files = ty.FileTable()
+        self._texts = IncludeCache()
 
     def resolve_path(self, name) -> Path:
         """Return a global file path where the source file for module *name*
-        is found. If none found returns *FileNotFoundError*.
+        is found. If none found returns *FileNotFoundError*. Each
+        searched folder is listed only once during the life of the
+        project.
 
         """
         log.info("Searching for module: %s", name)
         for root in self._load_paths:
             fpath = Path(root, *name.split("."))
             log.info("  - in %s", fpath.as_posix())
+            files = self._dirs.files(fpath.parent)
             for ext in self._exts:
                 full_path = fpath.with_suffix(ext)
-                if full_path.is_file():
+                if full_path.name in files:
                     log.info("  ! found and loading %s", full_path.as_posix())
                     return full_path
         raise FileNotFoundError(f"No file found for module '{name}'")
 
     def load_module(self, name, source, path, with_deps: bool = True) -> None:
-        """Recursively loads a (top) module with an arbitrary *name*, along
-        with all its `include` dependencies declared in the modules'
-        preamblies. *source* and *path* are passed to
-        :class:`Module`. If *with_deps* is unset it ignores the
-        `include` directives.
+        """Loads a (top) module with an arbitrary *name*, along with all its
+        `import` dependencies declared in the modules' preamblies,
+        which are found breadth-first and parsed concurrently in
+        a pool of *jobs* processes (see :class:`Project`). Regardless
+        of the order they are parsed in, the modules are stored in
+        :attr:`modules` depth-first, in the order of their
+        imports. *source* and *path* are passed to :class:`Module`. If
+        *with_deps* is unset it ignores the `import` directives. The
+        files pulled in with ``!include`` are released once all modules
+        are loaded.
 
         """
         if isinstance(path, Path):
@@ -274,73 +715,158 @@ class Project:
             if node.module in aliases:
                 node.module = aliases[node.module]
             return node
+
+        def _imports(module):
+            return [i[ty.ATTR_MODULE] for i in module.preamble.get(ty.ATTR_IMPORT, [])]
+
+        # parsed[name] = (path, Module), where an exception replaces
+        # the path if not found or the module if not parsed
+        try:
+            parsed = {name: (path, _try(_parse_module, source, path, self._key_nodes,
+                                        self._lazy_pos, self._cache, self.files,
+                                        self._texts))}
+            if with_deps:
+                self._parse_deps(parsed, _imports)
+                self._dirs.save()
+        finally:
+            self._texts.close()
+
+        def _store(name):
+            path, module = parsed[name]
+            try:
+                if isinstance(module, Exception):
+                    raise module
+                assert path == module.path
+                if name != module.name:
+                    msg = f"Wrong module name in preamble of {path}: "
+                    msg += f"expected '{name}' got '{module.name}'"
+                    raise ImportError(msg)
+
+                aliases = {
+                    i[ty.ATTR_ALIAS]: i[ty.ATTR_MODULE]
+                    for i in module.preamble.get(ty.ATTR_IMPORT, [])
+                    if ty.ATTR_ALIAS in i
+                }
+                module.walk(lambda node: _resolve_aliases(node, aliases))
+                self.modules[name] = module
+                if not with_deps:
+                    return
+                for dep_name in _imports(module):
+                    if dep_name not in self.modules:
+                        if isinstance(parsed[dep_name][0], Exception):
+                            raise parsed[dep_name][0]
+                        _store(dep_name)
+            except ModuleError as e:
+                raise e
+            except Exception as e:
+                raise ModuleError(e, module=name, path=path)
+
+        _store(name)
+
+    def _parse_deps(self, parsed, imports) -> None:
+        pool = ProcessPoolExecutor(self._jobs) if self._jobs > 1 else None
+        args = (self._key_nodes, self._lazy_pos, self._cache)
+        queue, futures = deque(parsed), {}
+
+        def _discover(module):
+            for dep_name in imports(module):
+                if dep_name in self.modules or dep_name in parsed:
+                    continue
+                try:
+                    dep_path = self.resolve_path(dep_name).as_posix()
+                except Exception as e:
+                    parsed[dep_name] = (e, None)
+                    continue
+                parsed[dep_name] = (dep_path, None)
+                if pool:
+                    futures[pool.submit(_parse_file, dep_path, *args)] = dep_name
+                else:
+                    queue.append(dep_name)
+
         try:
-            module = Module.from_zoml(source, path, self._key_nodes)
-            assert path == module.path
-            if name != module.name:
-                msg = f"Wrong module name in preamble of {path}: "
-                msg += f"expected '{name}' got '{module.name}'"
-                raise ImportError(msg)
-
-            aliases = {
-                i[ty.ATTR_ALIAS]: i[ty.ATTR_MODULE]
-                for i in module.preamble.get(ty.ATTR_IMPORT, [])
-                if ty.ATTR_ALIAS in i
-            }
-            module.map_doc(_resolve_aliases, aliases=aliases)
-            self.modules[name] = module
-            if not with_deps:
-                return
-            for dep in module.preamble.get(ty.ATTR_IMPORT, []):
-                if dep[ty.ATTR_MODULE] not in self.modules:
-                    dep_name = dep[ty.ATTR_MODULE]
-                    dep_path = self.resolve_path(dep_name)
-                    with open(dep_path) as f:
-                        self.load_module(dep_name, f, dep_path)
-        except ModuleError as e:
-            raise e
-        except Exception as e:
-            raise ModuleError(e, module=name, path=path)
+            while queue or futures:
+                if queue:
+                    name = queue.popleft()
+                    path, module = parsed[name]
+                    if module is None:
+                        module = _try(_parse_file, path, *args, self.files,
+                                      self._texts)
+                        parsed[name] = (path, module)
+                    if not isinstance(module, Exception):
+                        _discover(module)
+                    continue
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    module = future.exception() or future.result()
+                    if not isinstance(module, Exception):
+                        module.use_files(self.files)
+                    parsed[name] = (parsed[name][0], module)
+                    queue.append(name)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
 
     def build(self, name: str) -> None:
-        """Parses and resolves module *name*."""
+        """Parses and resolves module *name*.
+
+        The document is resolved in place in a single traversal. When
+        a node is attached with ``!attach`` from the same module, only
+        a referenced ``!attach`` node is resolved first, so that
+        chains of attached nodes are followed, whereas the rest of the
+        referenced subtree is attached as found (i.e., as from any
+        other module). Attached subtrees are then queued and visited
+        once at their new location, thus their relative references are
+        resolved at the attach site. An ``!attach`` reference which
+        (transitively) attaches itself is reported as a cycle.
+
+        Attached nodes share their children with the referenced tree
+        (see :meth:`zoti_yaml.core.Attach.resolve`). These children
+        are copied on write, i.e., only the containers on the path to
+        a node which changes are copied, whereas the rest of the
+        subtree remains shared with its source. The same holds for the
+        final post-processing pass (see :meth:`Module.walk`), thus the
+        built document might share subtrees with other modules and
+        should be copied before being altered in place.
+
+        """
         assert name in self.modules
         log.info(" ** Building module %s", name)
-        restart = True
-
-        # stitches nodes referenced with "!attach"
-        def _stitch_and_resolve(node, path):
-            nonlocal restart
-            try:
-                if isinstance(node, ty.Attach):
-                    restart = True
-                    return node.resolve(self.modules)
-                elif isinstance(node, ty.Ref):
-                    node.resolve(this=name, root=path)
-                    return node
-                return node
-            except Exception as e:
-                msg = (node.pos.show() + "\n" if node.pos else "") + str(e)
-                raise ModuleError(msg, module=name,
-                                  path=self.modules[name].path)
+        module = self.modules[name]
+        resolver = _Resolver(name, module, self.modules)
+        log.info("  * building the tree...")
+        resolver.run()
+
+        # removes the argument exchange fields, without altering shared nodes
+        def _drop_argfields(node):
+            if isinstance(node, dict) and any(k in node for k in self._argfields):
+                return {k: v for k, v in node.items() if k not in self._argfields}
+            return node
 
         # resolves default values specified with "!default"
-        def _postproc(node):
+        def _resolve_default(node):
             try:
-                if isinstance(node, ty.Default):
-                    return node.resolve()
-                if isinstance(node, dict):
-                    for key in self._argfields:
-                        if key in node:
-                            del node[key]
-                return node
+                return node.resolve() if isinstance(node, ty.Default) else node
             except Exception as e:
-                raise ModuleError(e, module=name, path=self.modules[name].path)
-
-        while restart:
-            log.info("  * (re)starting the tree build...")
-            restart = False
-            self.modules[name].map_doc(_stitch_and_resolve, with_path=True)
+                raise ModuleError(e, module=name, path=module.path)
 
         log.info("  * post-processing the tree...")
-        self.modules[name].map_doc(_postproc)
+        module.walk(_drop_argfields, _resolve_default, is_shared=resolver.is_shared)
+
+    def build_copy(self, name: str) -> Module:
+        """Builds a copy of module *name* (see :meth:`build`) and returns
+        it, leaving the loaded module unchanged. Since building never
+        changes the other modules, a project can be used to build any
+        number of main modules, e.g., importing each other, while
+        loading each dependency only once.
+
+        """
+        assert name in self.modules
+        loaded = self.modules[name]
+        self.modules[name] = Module(deepcopy(loaded.preamble), deepcopy(loaded.doc),
+                                    loaded.files)
+        try:
+            self.build(name)
+            return self.modules[name]
+        finally:
+            self.modules[name] = loaded
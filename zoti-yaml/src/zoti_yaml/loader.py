@@ -1,24 +1,192 @@
+import locale
 import logging as log
+import mmap
+import os
+from bisect import bisect_right
 from pathlib import Path
-from typing import Dict, Optional
-from importlib.metadata import distribution
+from typing import Dict, List
 
 import yaml
-from yaml.loader import SafeLoader
 from yaml.nodes import MappingNode, SequenceNode, ScalarNode
 
 import zoti_yaml.core as ty
 
+try:
+    # libyaml-based scanner and parser, if PyYAML was built with it
+    from yaml import CSafeLoader as BaseLoader
+except ImportError:
+    from yaml import SafeLoader as BaseLoader
+
+DIST, TOOL = ty.DIST, ty.TOOL
+
+
+class _TextFile:
+    """Content of a text file along with lazily built line indexes."""
+
+    def __init__(self, path, mmap_size):
+        self.data, self.encoding = None, None
+        size = os.path.getsize(path)
+        if size and size >= mmap_size:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # universal newlines are handled only for text reads
+            if mapped.find(b"\r") < 0:
+                self.data = mapped
+                self.encoding = locale.getpreferredencoding(False)
+            else:
+                mapped.close()
+        if self.data is None:
+            with open(path, "r") as f:
+                self.data = f.read()
+        self._nl = b"\n" if self.encoding else "\n"
+        self._starts = None
+        self._words = None
+        self._marked = {}
+        self.blocks = {}
+
+    def close(self) -> None:
+        """Releases the memory map of the file content, if any."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def decode(self, begin, end) -> str:
+        chunk = self.data[begin:end]
+        return chunk.decode(self.encoding) if self.encoding else chunk
+
+    @property
+    def starts(self) -> List[int]:
+        """offsets of the beginning of each line"""
+        if self._starts is None:
+            starts, idx = [], 0
+            while idx < len(self.data):
+                starts.append(idx)
+                idx = self.data.find(self._nl, idx) + 1 or len(self.data)
+            self._starts = starts
+        return self._starts
+
+    def line(self, k):
+        end = self.starts[k + 1] if k + 1 < len(self.starts) else len(self.data)
+        return self.data[self.starts[k]:end]
+
+    def marked(self, marker) -> List[int]:
+        """Returns the numbers of the lines starting with *marker*. All
+        lines are indexed by their first word on the first call, thus
+        later calls inspect only the lines which might match.
+
+        """
+        if marker in self._marked:
+            return self._marked[marker]
+        if self._words is None:
+            self._words = {}
+            for k in range(len(self.starts)):
+                word = self.line(k).split(None, 1)
+                self._words.setdefault(word[0] if word else self._nl[:0], []).append(k)
+        enc = marker.encode(self.encoding) if self.encoding else marker
+        word = enc.split(None, 1)
+        if not word:
+            lines = range(len(self.starts))
+        elif len(word) == 2 or enc[-1:].isspace():
+            lines = self._words.get(word[0], [])
+        else:
+            lines = sorted(k for w, ks in self._words.items()
+                           if w.startswith(word[0]) for k in ks)
+        start = self.starts
+        found = [k for k in lines if self.data[start[k]:start[k] + len(enc)] == enc]
+        self._marked[marker] = found
+        return found
+
+
+class IncludeCache:
+    """Cache of the text files pulled in with ``!include`` (see
+    :meth:`zoti_yaml.loader.ZomlLoader.include`), e.g., shared by all
+    the modules of a project. Each file is read only once, or
+    memory-mapped if larger than *mmap_size* bytes, and its lines are
+    indexed by their first word when a block is first extracted from
+    it. Extracted blocks are also remembered, thus including the same
+    block many times costs a dictionary lookup. The memory maps are
+    released with :meth:`close`, after which files are read anew.
+
+    """
+
+    def __init__(self, mmap_size: int = 1 << 20):
+        self._mmap_size = mmap_size
+        self._files: Dict[str, _TextFile] = {}
+
+    def _file(self, path) -> _TextFile:
+        key = os.path.abspath(path)
+        if key not in self._files:
+            self._files[key] = _TextFile(key, self._mmap_size)
+        return self._files[key]
+
+    def close(self) -> None:
+        """Forgets all files read so far, releasing their memory maps."""
+        for tf in self._files.values():
+            tf.close()
+        self._files.clear()
+
+    def text(self, path) -> str:
+        """Returns the entire content of file *path*."""
+        tf = self._file(path)
+        return tf.decode(0, len(tf.data))
+
+    def lines(self, path, begin: int, end: int) -> str:
+        """Returns the lines *begin* to *end* (counted from 1) of file *path*."""
+        tf = self._file(path)
+        key = (begin, end)
+        if key not in tf.blocks:
+            sel = range(len(tf.starts))[begin - 1: end]
+            tf.blocks[key] = tf.decode(
+                tf.starts[sel[0]], tf.starts[sel[-1]] + len(tf.line(sel[-1]))
+            ) if sel else ""
+        return tf.blocks[key]
+
+    def between(self, path, begin: str, end: str) -> str:
+        """Returns the lines of file *path* between the first line starting
+        with *begin* and the next one starting with *end*.
+
+        """
+        tf = self._file(path)
+        key = (begin, end)
+        if key not in tf.blocks:
+            begins, ends = tf.marked(begin), tf.marked(end)
+            if ends and (not begins or ends[0] <= begins[0]):
+                raise ValueError("End marker found before begin marker")
+            if not begins or not ends or ends[-1] <= begins[0]:
+                raise ValueError("Did not find markers")
+            last = ends[bisect_right(ends, begins[0])]
+            tf.blocks[key] = tf.decode(tf.starts[begins[0] + 1], tf.starts[last])
+        return tf.blocks[key]
+
+
+class LoaderWithInfo(BaseLoader):
+    """Safe YAML loader which attaches positional information to the
+    children of key nodes. It is built on top of the libyaml parser
+    (``yaml.CSafeLoader``) if available, otherwise it falls back to
+    the pure-Python ``yaml.SafeLoader``.
+
+    The file path and tool name in positional information are interned
+    in the :class:`zoti_yaml.core.FileTable` passed as *files*, if
+    any, so that all entries share the same string objects.
+
+    """
 
-class LoaderWithInfo(SafeLoader):
     def __init__(self, stream, **kwargs):
-        path = getattr(stream, "name")
+        path = kwargs.get("path") or getattr(stream, "name", None)
+        files = kwargs.get("files")
+        self._files = files if files is not None else ty.FileTable()
         self._path = Path(path) if path else None
         self._isfile = self._path and self._path.is_file()
+        self._posix = self._files.intern(self._path.as_posix()) if path else None
         self._tool = None
-        self._key_nodes = []
+        self._key_nodes = frozenset()
         super(LoaderWithInfo, self).__init__(stream)
 
+    def _pos(self, node) -> List:
+        """Positional information entry of *node*, as stored in the
+        document (see :meth:`zoti_yaml.core.Pos.from_entry`)."""
+        return ty.Pos.from_mark(node.start_mark, node.end_mark,
+                                self._posix, self._tool).dump()
+
     def construct_mapping(self, node, deep=False):
         """Override SafeLoader to add positional information for mappings."""
         mapping = super(LoaderWithInfo, self).construct_mapping(node, deep=deep)
@@ -28,35 +196,63 @@ class LoaderWithInfo(SafeLoader):
 
         # below is a hack: alter the 'node' object to communicate to
         # future calls of this method to add the 'mark_for_meta' entry.
-        for key, value in zip(mapping.keys(), node.value):
-            if key in self._key_nodes:
-                if isinstance(value[1], SequenceNode):
-                    for obj in value[1].value:
-                        if isinstance(obj, MappingNode):
-                            setattr(obj, "mark_for_meta", True)
-                elif isinstance(value[1], MappingNode):
-                    for obj in value[1].value:
-                        if isinstance(obj[1], MappingNode):
-                            setattr(obj[1], "mark_for_meta", True)
+        if not self._key_nodes.isdisjoint(mapping):
+            for key, value in zip(mapping.keys(), node.value):
+                if key in self._key_nodes:
+                    if isinstance(value[1], SequenceNode):
+                        for obj in value[1].value:
+                            if isinstance(obj, MappingNode):
+                                setattr(obj, "mark_for_meta", True)
+                    elif isinstance(value[1], MappingNode):
+                        for obj in value[1].value:
+                            if isinstance(obj[1], MappingNode):
+                                setattr(obj[1], "mark_for_meta", True)
 
         # here check previously altered 'node' entry
         if hasattr(node, "mark_for_meta"):
-            for key, value in zip(mapping.keys(), node.value):
-                if key == ty.INFO:
-                    mapping[ty.INFO] = super(
-                        LoaderWithInfo, self).construct_mapping(value[1], deep=True)
-            ty.attach_pos(mapping, ty.Pos.from_mark(
-                node.start_mark, node.end_mark, self._path.as_posix(), self._tool))
+            if ty.INFO in mapping:
+                for key, value in zip(mapping.keys(), node.value):
+                    if key == ty.INFO:
+                        mapping[ty.INFO] = super(
+                            LoaderWithInfo, self).construct_mapping(value[1], deep=True)
+            info = mapping.setdefault(ty.INFO, {})
+            info[ty.POS] = info.get(ty.POS) or []
+            info[ty.POS].append(self._pos(node))
         return mapping
 
 
 class ZomlLoader(LoaderWithInfo):
-    """YAML loader class with extra spices."""
-
-    def __init__(self, stream, key_nodes=[], **kwargs):
-        super(ZomlLoader, self).__init__(stream)
-        self._tool = distribution("zoti_yaml").name + "-" + distribution("zoti_yaml").version
-        self._key_nodes = key_nodes
+    """YAML loader class with extra spices.
+
+    If *lazy_pos* is set, the positional information of each node is
+    recorded as a compact ``[file, start, end]`` entry, where *file*
+    is the index of the source path in the table passed as
+    *files*. Its line and column are computed by
+    :class:`zoti_yaml.core.Pos` only if ever shown, e.g., when
+    rendering an error.
+
+    """
+
+    def __init__(self, stream, key_nodes=[], includes=None, texts=None,
+                 lazy_pos=False, **kwargs):
+        super(ZomlLoader, self).__init__(stream, **kwargs)
+        self._tool = self._files.intern(TOOL)
+        self._key_nodes = frozenset(key_nodes)
+        self._includes = includes if includes is not None else []
+        self._own_texts = texts is None
+        self._texts = texts if texts is not None else IncludeCache()
+        self._fid = (self._files.index(self._posix)
+                     if lazy_pos and self._posix is not None else None)
+
+    def _pos(self, node) -> List:
+        if self._fid is None:
+            return super(ZomlLoader, self)._pos(node)
+        return [self._fid, node.start_mark.index, node.end_mark.index]
+
+    def dispose(self):
+        if self._own_texts:
+            self._texts.close()
+        super(ZomlLoader, self).dispose()
 
 
     def include(self, node):
@@ -76,49 +272,28 @@ class ZomlLoader(LoaderWithInfo):
         block_name``. In the third case the start and stop lines are
         specified either as line numbers or by arbitrary keywords.
 
-        """
+        Files are read through the :class:`IncludeCache`
+        passed as *texts*, if any, e.g., shared by all modules in a
+        project.
 
-        def full_file(path):
-            with open(path, "r") as f:
-                return f.read()
-
-        def between_indexes(path, begin, end):
-            with open(path, "r") as f:
-                lines = f.readlines()[begin - 1: end]
-                return "".join(lines)
-
-        def between_markers(path, begin, end):
-            with open(path, "r") as f:
-                content = f.readlines()
-                lines, storing = ([], False)
-                for line in content:
-                    if line.startswith(end):
-                        if storing:
-                            return "".join(lines)
-                        else:
-                            raise ValueError(
-                                "End marker found before begin marker")
-                    if storing:
-                        lines.append(line)
-                    if line.startswith(begin):
-                        storing = True
-                raise ValueError("Did not find markers")
+        """
 
         args = self.construct_mapping(node)
         try:
             path = self._path.parent.joinpath(args["file"])
+            self._includes.append(path)
             if "name" in args:
-                return between_markers(
+                return self._texts.between(
                     path, f"BEGIN {args['name']}", f"END {args['name']}"
                 )
             elif "begin" in args and "end" in args:
                 try:
-                    return between_indexes(path, int(args["begin"]),
-                                           int(args["end"]))
+                    return self._texts.lines(path, int(args["begin"]),
+                                             int(args["end"]))
                 except Exception:
-                    return between_markers(path, args["begin"], args["end"])
+                    return self._texts.between(path, args["begin"], args["end"])
             else:
-                return full_file(path)
+                return self._texts.text(path)
 
         except Exception as e:
             raise yaml.MarkedYAMLError(
@@ -137,8 +312,7 @@ class ZomlLoader(LoaderWithInfo):
     def construct_attach(self, node):
         try:
             mapping = self.construct_mapping(node, deep=True)
-            pos = ty.Pos.from_mark(node.start_mark, node.end_mark,
-                                   self._path.as_posix(), self._tool)
+            pos = ty.Pos.from_entry(self._pos(node), self._files)
             return ty.Attach(pos=pos, **mapping)
         except Exception as e:
             raise yaml.MarkedYAMLError(
@@ -1,12 +1,15 @@
 import os
 import sys
+import pytest
 import yaml
-from pprint import pprint
+from pprint import pformat, pprint
 from pathlib import PurePosixPath
 
 sys.path.insert(0, "src")
 from zoti_yaml import Project, Module, Pos, PosStack, get_pos
+from zoti_yaml.exceptions import ModuleError
 from zoti_yaml.dumper import ZotiDumper
+from zoti_yaml.core import Default
 
 
 def test_scenario1() -> None:
@@ -58,3 +61,408 @@ def test_scenario1() -> None:
     finally:
         os.remove("tmp.yaml")
         pass
+
+
+@pytest.mark.parametrize("lazy_pos", [False, True])
+def test_module_cache(tmp_path, monkeypatch, lazy_pos) -> None:
+    def _load():
+        proj = Project(keys=["root", "nodes"],
+                       pathvar=["tests/scenario1"],
+                       ext=[".zoml"],
+                       cache_dir=tmp_path,
+                       lazy_pos=lazy_pos,
+                       )
+        path = proj.resolve_path("main")
+        with open(path) as f:
+            proj.load_module("main", f, path)
+        proj.build("mod1")
+        proj.build("main")
+        return proj
+
+    first = _load()
+    assert len(list(tmp_path.glob("*.pickle"))) == 3
+
+    def _no_parse(*args, **kwargs):
+        raise AssertionError("module should have been loaded from cache")
+
+    monkeypatch.setattr(Module, "from_zoml", _no_parse)
+    second = _load()
+    assert first.modules.keys() == second.modules.keys()
+    for name in first.modules:
+        assert (pformat(first.modules[name].to_dump())
+                == pformat(second.modules[name].to_dump()))
+
+
+def test_attach_cycle(tmp_path) -> None:
+    tmp_path.joinpath("cyc.zoml").write_text(
+        "module: cyc\n---\n"
+        "root:\n"
+        "  a: !attach {ref: !ref {path: /root/b}}\n"
+        "  b:\n"
+        "    c: !attach {ref: !ref {path: /root/a}}\n"
+    )
+    proj = Project(pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("cyc")
+    with open(path) as f:
+        proj.load_module("cyc", f, path)
+    try:
+        proj.build("cyc")
+        assert False, "cycle not detected"
+    except ModuleError as e:
+        assert "Cycle detected" in str(e)
+
+
+def test_attach_cycle_across_modules(tmp_path) -> None:
+    tmp_path.joinpath("lib.zoml").write_text(
+        "module: lib\nimport: [{module: main}]\n---\n"
+        "root:\n"
+        "  - name: x\n"
+        "    nodes:\n"
+        "      - !attach {ref: !ref {module: main, path: \"/root[a]\"}, name: q}\n"
+    )
+    tmp_path.joinpath("main.zoml").write_text(
+        "module: main\nimport: [{module: lib}]\n---\n"
+        "root:\n"
+        "  - name: a\n"
+        "    nodes:\n"
+        "      - !attach {ref: !ref {module: lib, path: \"/root[x]\"}, name: z}\n"
+    )
+    proj = Project(keys=["root", "nodes"], pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("main")
+    with open(path) as f:
+        proj.load_module("main", f, path)
+    # also after a failed build of the imported module
+    for name in ["main", "lib", "main"]:
+        try:
+            proj.build(name)
+            assert False, "cycle not detected"
+        except ModuleError as e:
+            assert "Cycle detected" in str(e)
+
+
+def test_attach_shares_source(tmp_path) -> None:
+    tmp_path.joinpath("lib.zoml").write_text(
+        "module: lib\n---\n"
+        "root:\n"
+        "  skel:\n"
+        "    name: skel\n"
+        "    body: {size: 8, data: [1, 2, 3]}\n"
+        "    here: !ref {path: ../body}\n"
+    )
+    tmp_path.joinpath("app.zoml").write_text(
+        "module: app\nimport: [{module: lib}]\n---\n"
+        "root:\n"
+        "  - !attach {ref: !ref {module: lib, path: /root/skel}, name: a}\n"
+        "  - !attach {ref: !ref {module: lib, path: /root/skel}, name: b}\n"
+    )
+    proj = Project(pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("app")
+    with open(path) as f:
+        proj.load_module("app", f, path)
+    before = pformat(proj.modules["lib"].doc)
+    proj.build("app")
+    assert pformat(proj.modules["lib"].doc) == before
+    app = proj.modules["app"]
+    assert str(app.get("/root[a]/here").path) == "/root[a]/body"
+    assert str(app.get("/root[b]/here").path) == "/root[b]/body"
+    assert app.get("/root[b]/body/data") == [1, 2, 3]
+    assert app.get("/root[a]/_info/_prev_attrs/name") == "skel"
+
+
+def test_attach_copy_on_write(tmp_path) -> None:
+    tmp_path.joinpath("lib.zoml").write_text(
+        "module: lib\n---\n"
+        "root:\n"
+        "  skel:\n"
+        "    name: skel\n"
+        "    body:\n"
+        "      data: [1, 2, 3]\n"
+        "      deep: {here: !ref {path: ../../data}}\n"
+        "      conf: !default [{mode: fast}, {size: 8}]\n"
+        "      zoti-args: {arg: 1}\n"
+        "    peer: !attach {ref: !ref {module: lib, path: /root/other}}\n"
+        "  other: {v: 1, back: !ref {path: ../v}}\n"
+    )
+    tmp_path.joinpath("app.zoml").write_text(
+        "module: app\nimport: [{module: lib}]\n---\n"
+        "root:\n"
+        "  - !attach {ref: !ref {module: lib, path: /root/skel}, name: a}\n"
+        "  - !attach {ref: !ref {module: lib, path: /root/skel}, name: b}\n"
+        "  - name: c\n"
+        "    body: !attach {ref: !ref {path: \"/root[a]/body\"}}\n"
+    )
+    proj = Project(pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("app")
+    with open(path) as f:
+        proj.load_module("app", f, path)
+    lib = proj.modules["lib"]
+    before = pformat(lib.doc)
+    proj.build("app")
+    assert pformat(lib.doc) == before
+    assert isinstance(lib.doc["root"]["skel"]["body"]["conf"], Default)
+    assert "zoti-args" in lib.get("/root/skel/body")
+    assert lib.get("/root/skel/name") == "skel"
+
+    app = proj.modules["app"]
+    for name in ["a", "b", "c"]:
+        body = app.get(f"/root[{name}]/body")
+        assert str(body["deep"]["here"].path) == f"/root[{name}]/body/data"
+        assert body["conf"] == {"mode": "fast", "size": 8}
+        assert "zoti-args" not in body
+        # unchanged children are still shared with the source
+        assert body["data"] is lib.get("/root/skel/body/data")
+    assert str(app.get("/root[b]/peer/back").path) == "/root[b]/peer/v"
+    assert app.get("/root[b]/name") == "b"
+
+    # building the source module afterwards is not affected either
+    proj.build("lib")
+    assert str(lib.get("/root/skel/body/deep/here").path) == "/root/skel/body/data"
+    assert str(app.get("/root[a]/body/deep/here").path) == "/root[a]/body/data"
+
+
+def test_attach_copy_on_write_same_module(tmp_path) -> None:
+    tmp_path.joinpath("app.zoml").write_text(
+        "module: app\n---\n"
+        "root:\n"
+        "  - name: skel\n"
+        "    mode: slow\n"
+        "    body: {data: [1, 2], here: !ref {path: ../data}}\n"
+        "  - !attach {ref: !ref {path: \"/root[skel]\"}, name: a, mode: fast}\n"
+        "  - !attach {ref: !ref {path: \"/root[a]\"}, name: b}\n"
+    )
+    proj = Project(keys=["root"], pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("app")
+    with open(path) as f:
+        proj.load_module("app", f, path)
+    proj.build("app")
+    app = proj.modules["app"]
+    assert app.get("/root[skel]/mode") == "slow"
+    assert app.get("/root[a]/mode") == "fast"
+    assert app.get("/root[b]/mode") == "fast"
+    assert app.get("/root[b]/_info/_prev_attrs/name") == "a"
+    assert str(app.get("/root[skel]/body/here").path) == "/root[skel]/body/data"
+    assert app.get("/root[a]/body/data") is app.get("/root[skel]/body/data")
+
+
+def test_attach_forward_ref(tmp_path) -> None:
+    tmp_path.joinpath("fwd.zoml").write_text(
+        "module: fwd\n---\n"
+        "root:\n"
+        "  - !attach {ref: !ref {path: \"/root[x]\"}, name: y}\n"
+        "  - name: x\n"
+        "    body: {size: 8}\n"
+        "    here: !ref {path: ../body}\n"
+    )
+    proj = Project(keys=["root"], pathvar=[tmp_path], ext=[".zoml"])
+    path = proj.resolve_path("fwd")
+    with open(path) as f:
+        proj.load_module("fwd", f, path)
+    proj.build("fwd")
+    fwd = proj.modules["fwd"]
+    assert str(fwd.get("/root[y]/here").path) == "/root[y]/body"
+    assert str(fwd.get("/root[x]/here").path) == "/root[x]/body"
+    assert fwd.get("/root[y]/body/size") == 8
+
+
+def test_get_index() -> None:
+    mod = Module({"module": "m"}, {"root": [{"name": "a", "v": 1},
+                                          {"name": "b", "v": 2}]})
+    assert mod.get("/root[b]/v") == 2
+    assert mod.get("/root[0]/v") == 1
+    # in-place changes are picked up by the (lazy) index
+    mod.doc["root"].insert(0, {"name": "b", "v": 3})
+    assert mod.get("/root[b]/v") == 3
+    mod.doc["root"][0]["name"] = "c"
+    assert mod.get("/root[b]/v") == 2
+    assert mod.get("/root[c]/v") == 3
+    assert mod.get("/root[d]", strict=False) is None
+
+
+def test_build_copy() -> None:
+    proj = Project(keys=["root", "nodes"],
+                   pathvar=["tests/scenario1"],
+                   ext=[".zoml"]
+                   )
+    path = proj.resolve_path("main")
+    with open(path) as f:
+        proj.load_module("main", f, path)
+    loaded = pformat(proj.modules["main"].doc)
+    first = proj.build_copy("main")
+    second = proj.build_copy("main")
+    assert pformat(proj.modules["main"].doc) == loaded
+    assert pformat(first.doc) == pformat(second.doc)
+    assert second.get("/root[n2]/_info/_prev_attrs/name") == "n1"
+
+
+def test_binary_roundtrip(monkeypatch) -> None:
+    pytest.importorskip("msgpack")
+    import json
+    from zoti_yaml import binary
+    from zoti_yaml.dumper import ZotiEncoder
+    proj = Project(keys=["root", "nodes"],
+                   pathvar=["tests/scenario1"],
+                   ext=[".zoml"]
+                   )
+    path = proj.resolve_path("main")
+    with open(path) as f:
+        proj.load_module("main", f, path)
+    module = proj.build_copy("main")
+    dumped = module.to_dump(packed=True)
+    data = binary.dumps(dumped)
+    assert binary.is_binary(data)
+    expected = json.loads(json.dumps(dumped, cls=ZotiEncoder))
+    assert binary.loads(data) == expected
+    native = binary.loads(data, native=True)
+    assert pformat(native) == pformat(dumped)
+
+    monkeypatch.setattr(binary, "msgpack", None)
+    assert binary.is_binary(data)
+    with pytest.raises(ImportError, match="zoti-yaml\\[binary\\]"):
+        binary.dumps(dumped)
+    with pytest.raises(ImportError, match="zoti-yaml\\[binary\\]"):
+        binary.loads(data)
+
+
+def test_file_table() -> None:
+    proj = Project(keys=["root", "nodes"],
+                   pathvar=["tests/scenario1"],
+                   ext=[".zoml"]
+                   )
+    path = proj.resolve_path("main")
+    with open(path) as f:
+        proj.load_module("main", f, path)
+    module = proj.build_copy("main")
+    preamble, doc = module.to_dump()
+    assert "_files" not in preamble
+    assert doc["root"][0]["_info"]["_pos"][0][4] == "tests/scenario1/main.zoml"
+    preamble, doc = module.to_dump(packed=True)
+    files = preamble["_files"]
+    assert len(files) == len(set(files))
+    pos = doc["root"][0]["_info"]["_pos"][0]
+    assert files[pos[4]] == "tests/scenario1/main.zoml"
+    assert "_files" not in module.preamble
+    loaded = Module(preamble, doc, proj.files)
+    assert "_files" not in loaded.preamble
+    assert pformat(loaded.doc) == pformat(module.doc)
+    assert loaded.doc["root"][0]["_info"]["_pos"][0][4] is proj.files.intern(path.as_posix())
+
+
+def test_lazy_pos() -> None:
+    def _load(**kwargs):
+        proj = Project(keys=["root", "nodes"],
+                       pathvar=["tests/scenario1"],
+                       ext=[".zoml"], **kwargs
+                       )
+        path = proj.resolve_path("main")
+        with open(path) as f:
+            proj.load_module("main", f, path)
+        return proj
+
+    proj_e, proj_l = _load(), _load(lazy_pos=True)
+    eager, lazy = proj_e.modules["main"], proj_l.modules["main"]
+    node_e = eager.get("/root[n1]/nodes[n1_n1]")
+    node_l = lazy.get("/root[n1]/nodes[n1_n1]")
+    entry_l, entry_e = node_l["_info"]["_pos"][0], node_e["_info"]["_pos"][0]
+    assert entry_l == [lazy.files.index(entry_e[4])] + entry_e[2:4]
+    assert repr(get_pos(node_l, lazy.files)) == repr(get_pos(node_e))
+    assert get_pos(node_l, lazy.files).show() == get_pos(node_e).show()
+    for packed in [False, True]:
+        dumped_l = proj_l.build_copy("main").to_dump(packed)
+        dumped_e = proj_e.build_copy("main").to_dump(packed)
+        assert dumped_l[0].get("_files") == dumped_e[0].get("_files")
+        pos_l = dumped_l[1]["root"][0]["_info"]["_pos"][0]
+        pos_e = dumped_e[1]["root"][0]["_info"]["_pos"][0]
+        assert pos_l == [None, None] + pos_e[2:]
+
+
+@pytest.mark.parametrize("lazy_pos", [False, True])
+def test_parallel_load(lazy_pos) -> None:
+    def _load(jobs):
+        proj = Project(keys=["root", "nodes"],
+                       pathvar=["tests/scenario1"],
+                       ext=[".zoml"], jobs=jobs, lazy_pos=lazy_pos
+                       )
+        path = proj.resolve_path("main")
+        with open(path) as f:
+            proj.load_module("main", f, path)
+        return proj
+
+    serial, parallel = _load(1), _load(2)
+    assert list(parallel.modules) == list(serial.modules)
+    assert sorted(parallel.files.dump()) == sorted(serial.files.dump())
+    for name, module in serial.modules.items():
+        assert parallel.modules[name].files is parallel.files
+        assert pformat(parallel.modules[name].to_dump()) == pformat(module.to_dump())
+    if not lazy_pos:
+        pos = parallel.modules["sub.mod"].get("/root/nodes[n1]")["_info"]["_pos"][0]
+        assert pos[4] is parallel.files.intern("tests/scenario1/sub/mod.zoml")
+
+
+def test_directory_index(tmp_path) -> None:
+    import time
+    from zoti_yaml.cache import DirectoryIndex
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    (lib / "a.zoml").write_text("module: lib.a\n---\n{}\n")
+    past = time.time() - 10
+    os.utime(lib, (past, past))
+
+    proj = Project(pathvar=[str(tmp_path)], ext=[".yaml", ".zoml"],
+                   cache_dir=str(tmp_path / "cache"))
+    assert proj.resolve_path("lib.a") == lib / "a.zoml"
+    with pytest.raises(FileNotFoundError):
+        proj.resolve_path("lib.b")
+    proj._dirs.save()
+
+    # listings are reused as long as the folder is not modified
+    index = DirectoryIndex(tmp_path / "cache")
+    assert index._stored[lib.as_posix()][1] == {"a.zoml"}
+    (lib / "b.zoml").write_text("module: lib.b\n---\n{}\n")
+    assert DirectoryIndex(tmp_path / "cache").files(lib) == {"a.zoml", "b.zoml"}
+
+
+def test_include_cache(tmp_path) -> None:
+    from zoti_yaml.loader import IncludeCache
+    src = tmp_path / "kernel.dfc"
+    src.write_text("BEGIN b1\none\nEND b1\n// v b2\ntwo\nthree\n// ^ b2\nEND b3\nBEGIN b3\n")
+    for texts in [IncludeCache(), IncludeCache(mmap_size=0)]:
+        assert texts.between(src, "BEGIN b1", "END b1") == "one\n"
+        assert texts.between(src, "// v b2", "// ^ b2") == "two\nthree\n"
+        assert texts.lines(src, 5, 6) == "two\nthree\n"
+        assert texts.text(src) == src.read_text()
+        with pytest.raises(ValueError, match="End marker found before"):
+            texts.between(src, "BEGIN b3", "END b3")
+        with pytest.raises(ValueError, match="Did not find"):
+            texts.between(src, "BEGIN b4", "END b4")
+
+    # memory maps are released on close, and files are read anew
+    texts = IncludeCache(mmap_size=0)
+    data = texts._file(src).data
+    texts.close()
+    assert data.closed
+    assert texts.text(src) == src.read_text()
+
+
+def test_walk() -> None:
+    shared = {"x": {"zoti-args": 1, "y": 2}}
+    owned = {"x": {"y": 3}}
+    module = Module({"module": "m"}, {"a": [shared, owned], "b": shared})
+    root, lst = module.doc, module.doc["a"]
+
+    def _drop(node):
+        if isinstance(node, dict) and "zoti-args" in node:
+            return {k: v for k, v in node.items() if k != "zoti-args"}
+        return node
+
+    def _mark(node):
+        if isinstance(node, dict) and "y" in node:
+            node["seen"] = node.get("seen", 0) + 1
+        return node
+
+    module.walk(_drop, _mark,
+                is_shared=lambda node, parent: parent or node is shared)
+    assert module.doc is root and module.doc["a"] is lst
+    assert lst[1] is owned and owned["x"] == {"y": 3, "seen": 1}
+    assert shared == {"x": {"zoti-args": 1, "y": 2}}
+    assert lst[0] == {"x": {"y": 2, "seen": 1}}
+    assert module.doc["b"] is lst[0]